@@ -37,4 +37,5 @@ class ContainerAdmin(admin.ModelAdmin):
 
 
 admin.site.register(CourseRequest)
+admin.site.register(RequestTicket)
 admin.site.register(CourseMediaFilesLinks)
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import transaction
+
+from course_module.models import CourseRequest, ContainerToCourse, CourseContainer
+from eITIS.enums import ACCEPTED, REJECTED, RANKED_ALLOCATION
+
+# requests are updated by chunks, so the statements stay under parameter limits of databases
+UPDATE_CHUNK_SIZE = 500
+
+
+# payload of a container is (seats, preferences): seats maps course id to (quantity, min_quantity),
+# preferences is a list of (score, student id, [(course id, request id), ...]) with options ordered
+# by priority of the student. Returns the set of accepted request ids.
+def solve_container(payload):
+    # all courses rank students by score, so deferred acceptance comes down to serving students
+    # in order of score, each one by the most wanted course with a free seat
+    seats, preferences = payload
+    preferences = sorted(preferences, key=lambda item: (-item[0], item[1]))
+    open_courses = set(seats)
+    while True:
+        taken = dict.fromkeys(open_courses, 0)
+        accepted = set()
+        for score, student_id, options in preferences:
+            for course_id, request_id in options:
+                if course_id not in taken:
+                    continue
+                quantity = seats[course_id][0]
+                if quantity is None or taken[course_id] < quantity:
+                    taken[course_id] += 1
+                    accepted.add(request_id)
+                    break
+        # a course which can't gather min_quantity students is cancelled (the emptiest first)
+        # and its students are distributed again
+        unfilled = [course_id for course_id in open_courses if taken[course_id] < seats[course_id][1]]
+        if not unfilled:
+            return accepted
+        open_courses.remove(min(unfilled, key=lambda course_id: (taken[course_id], course_id)))
+
+
+def load_payloads(container_ids):
+    seats = defaultdict(dict)
+    for course_id, container_id, quantity, min_quantity in ContainerToCourse.objects.filter(
+            container_id__in=container_ids).values_list('id', 'container_id', 'quantity', 'min_quantity'):
+        seats[container_id][course_id] = (quantity, min_quantity)
+
+    students = defaultdict(dict)
+    requests = CourseRequest.objects.filter(
+        active_course__container_id__in=container_ids
+    ).exclude(status=REJECTED).order_by('priority', 'id').values_list(
+        'active_course__container_id', 'student_id', 'score', 'active_course_id', 'id')
+    for container_id, student_id, score, course_id, request_id in requests.iterator():
+        student = students[container_id].setdefault(student_id, (score, student_id, []))
+        student[2].append((course_id, request_id))
+    return {container_id: (seats[container_id], list(students[container_id].values()))
+            for container_id in container_ids}
+
+
+def get_request_ids(payload):
+    seats, preferences = payload
+    return {request_id for score, student_id, options in preferences for course_id, request_id in options}
+
+
+def update_status(request_ids, status):
+    request_ids = sorted(request_ids)
+    for start in range(0, len(request_ids), UPDATE_CHUNK_SIZE):
+        CourseRequest.objects.filter(pk__in=request_ids[start:start + UPDATE_CHUNK_SIZE]).update(status=status)
+
+
+@transaction.atomic
+def save_assignment(container_id, loaded_ids, accepted_ids):
+    # only requests given to the solver are decided, requests created while it worked keep waiting
+    update_status(set(loaded_ids) - set(accepted_ids), REJECTED)
+    update_status(accepted_ids, ACCEPTED)
+    ContainerToCourse.objects.filter(container_id=container_id).rebuild_counters()
+    ContainerToCourse.objects.filter(container_id=container_id).rebuild_statistics()
+
+
+def allocate_containers(container_ids=None, workers=1):
+    # containers are independent, so they are solved in parallel by worker processes
+    containers = CourseContainer.objects.filter(allocation_mode=RANKED_ALLOCATION)
+    if container_ids is not None:
+        containers = containers.filter(id__in=container_ids)
+    container_ids = list(containers.values_list('id', flat=True))
+    payloads = load_payloads(container_ids)
+
+    if workers > 1 and len(container_ids) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(solve_container, [payloads[container_id] for container_id in container_ids]))
+    else:
+        results = [solve_container(payloads[container_id]) for container_id in container_ids]
+
+    for container_id, accepted_ids in zip(container_ids, results):
+        save_assignment(container_id, get_request_ids(payloads[container_id]), accepted_ids)
+    return {container_id: len(accepted_ids) for container_id, accepted_ids in zip(container_ids, results)}
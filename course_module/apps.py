@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CourseManagerConfig(AppConfig):
     name = 'course_module'
     verbose_name = "Модуль курсов по выбору"
+
+    def ready(self):
+        from course_module import checks
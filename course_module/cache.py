@@ -0,0 +1,182 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from eITIS.db_router import get_read_database, use_replicas, PRIMARY
+
+# courses, containers, their relations and heads
+STRUCTURE_VERSION = 'structure'
+# requests and seat counters of courses
+REQUESTS_VERSION = 'requests'
+
+# requests and seat counters of courses of one container
+CONTAINER_VERSION = 'container:{}'
+
+KEY_PREFIX = 'course_cache'
+HITS, MISSES = 'hits', 'misses'
+
+
+def get_cache():
+    return caches[settings.COURSE_CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.COURSE_CACHE_ALIAS is not None
+
+
+def get_versions(scopes):
+    cache = get_cache()
+    keys = ['{}:version:{}'.format(KEY_PREFIX, scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # versions start from the current time, so they don't repeat after the cache was cleared
+            cache.add(key, int(time.time() * 1000), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_version(scope):
+    return get_versions([scope])[0]
+
+
+def container_scopes(container_ids):
+    return [CONTAINER_VERSION.format(container_id) for container_id in sorted(set(container_ids))]
+
+
+def bump_versions(*scopes):
+    if not is_enabled():
+        return
+
+    def bump():
+        cache = get_cache()
+        for scope in scopes:
+            key = '{}:version:{}'.format(KEY_PREFIX, scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, int(time.time() * 1000), None)
+
+    # the second bump after commit drops responses which were cached by concurrent
+    # readers between the first bump and the commit (they still saw old rows)
+    bump()
+    transaction.on_commit(bump)
+
+
+def count(stat):
+    cache = get_cache()
+    key = '{}:stats:{}'.format(KEY_PREFIX, stat)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def bump_container_versions(container_ids):
+    bump_versions(*container_scopes(container_ids))
+
+
+def get_stats():
+    stats = {stat: get_cache().get('{}:stats:{}'.format(KEY_PREFIX, stat), 0) if is_enabled() else 0
+             for stat in (HITS, MISSES)}
+    requests = stats[HITS] + stats[MISSES]
+    stats['hit_ratio'] = stats[HITS] / requests if requests else 0
+    return stats
+
+
+def reset_stats():
+    if is_enabled():
+        get_cache().delete_many(['{}:stats:{}'.format(KEY_PREFIX, stat) for stat in (HITS, MISSES)])
+
+
+class VersionedResponseMixin:
+    # responses of list and retrieve depend only on request and versions of scopes from get_version_scopes,
+    # hash of both is ETag of response and key of cached response
+    version_scopes = (STRUCTURE_VERSION,)
+
+    def get_version_scopes(self):
+        return list(self.version_scopes)
+
+    def get_cache_owner(self):
+        # responses with my=true depend on group of student or on professor himself
+        user = self.request.user
+        if self.request.query_params.get('my') not in ('true', 'True', '1'):
+            return None
+        if user.role == 'student':
+            return 'group:{}'.format(user.student_profile.group_id)
+        if user.role == 'professor':
+            return 'user:{}'.format(user.id)
+        return None
+
+    def get_response_version(self):
+        if not hasattr(self, '_response_version'):
+            scopes = self.get_version_scopes()
+            key = json.dumps([
+                self.basename, self.action, self.kwargs, sorted(self.request.query_params.lists()),
+                self.request.accepted_renderer.format, self.request.user.role, self.get_cache_owner(),
+                scopes, get_versions(scopes),
+            ], sort_keys=True, default=str)
+            self._response_version = hashlib.md5(key.encode()).hexdigest()
+        return self._response_version
+
+    def versioned_response(self, view_method, request, *args, **kwargs):
+        return view_method(request, *args, **kwargs)
+
+    def is_fresh_response(self):
+        # replica may lag behind the bumped versions, its response would get their ETag
+        return get_read_database() == PRIMARY
+
+    def list(self, request, *args, **kwargs):
+        return self.versioned_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.versioned_response(super().retrieve, request, *args, **kwargs)
+
+
+class CachedResponseMixin(VersionedResponseMixin):
+    def versioned_response(self, view_method, request, *args, **kwargs):
+        if not is_enabled():
+            return super().versioned_response(view_method, request, *args, **kwargs)
+        cache = get_cache()
+        key = '{}:response:{}'.format(KEY_PREFIX, self.get_response_version())
+        data = cache.get(key)
+        if data is not None:
+            count(HITS)
+            return Response(data=data, headers={'X-Cache': 'HIT'})
+        count(MISSES)
+        # cached response is built on primary, a lagging replica would leave stale rows
+        # under the new versions for all readers, including the writer itself
+        with use_replicas(False):
+            response = super().versioned_response(view_method, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.COURSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def is_fresh_response(self):
+        return True
+
+
+class ConditionalResponseMixin(VersionedResponseMixin):
+    # polls with If-None-Match of unchanged response get 304 without serializing anything
+    def versioned_response(self, view_method, request, *args, **kwargs):
+        if not is_enabled():
+            # versions aren't shared by workers without the cache, so ETags of workers would differ
+            return super().versioned_response(view_method, request, *args, **kwargs)
+        etag = '"{}"'.format(self.get_response_version())
+        # If-None-Match uses weak comparison
+        if_none_match = [tag[2:] if tag.startswith('W/') else tag
+                         for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))]
+        if etag in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = super().versioned_response(view_method, request, *args, **kwargs)
+        if response.status_code == 200 and self.is_fresh_response():
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, Tags, register
+
+from course_module.search import get_missing_search_triggers
+
+# backends which keep entries in memory of one process
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_course_cache(app_configs, **kwargs):
+    # versions bumped by one worker must be seen by all of them, otherwise they serve stale responses and ETags
+    alias = settings.COURSE_CACHE_ALIAS
+    if alias is None:
+        return []
+    if alias not in settings.CACHES:
+        return [Error('COURSE_CACHE_ALIAS = {!r} нет в CACHES'.format(alias), id='course_module.E001')]
+    if settings.CACHES[alias]['BACKEND'] in PROCESS_CACHE_BACKENDS:
+        return [Error('Кэш курсов {!r} не общий для процессов'.format(alias),
+                      hint='Используйте memcached или redis, или COURSE_CACHE_ALIAS = None',
+                      id='course_module.E002')]
+    return []
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, **kwargs):
+    # runs by `manage.py check --tag database` and before migrate, a warning doesn't block the migration
+    # which creates the triggers again
+    return [Warning('Нет триггера {} индекса поиска курсов'.format(name),
+                    hint='Создайте триггеры заново, как в миграции 0011_course_search',
+                    id='course_module.W001') for name in get_missing_search_triggers()]
@@ -0,0 +1,129 @@
+import csv
+import zipfile
+from xml.sax.saxutils import escape
+
+from eITIS.enums import ACCEPTED
+
+# columns of enrollment lists, all of them are read by one query of requests
+EXPORT_COLUMNS = (
+    ('active_course__course__name', 'Курс'),
+    ('student__last_name', 'Фамилия'),
+    ('student__first_name', 'Имя'),
+    ('student__middle_name', 'Отчество'),
+    ('student__email', 'Email'),
+    ('student__student_profile__group__group_number', 'Группа'),
+    ('score', 'Балл'),
+)
+# rows fetched from the (server-side on PostgreSQL) cursor at once and written into one chunk of response
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+XLSX_NAMESPACE = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_RELATIONSHIPS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_DOCUMENT_RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_PARTS = (
+    ('[Content_Types].xml',
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<Relationships xmlns="{}"><Relationship Id="rId1" Target="xl/workbook.xml" '
+     'Type="{}/officeDocument"/></Relationships>'.format(XLSX_RELATIONSHIPS, XLSX_DOCUMENT_RELATIONSHIPS)),
+    ('xl/workbook.xml',
+     '<workbook xmlns="{}" xmlns:r="{}"><sheets><sheet name="Зачисленные" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'.format(XLSX_NAMESPACE, XLSX_DOCUMENT_RELATIONSHIPS)),
+    ('xl/_rels/workbook.xml.rels',
+     '<Relationships xmlns="{}"><Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+     'Type="{}/worksheet"/></Relationships>'.format(XLSX_RELATIONSHIPS, XLSX_DOCUMENT_RELATIONSHIPS)),
+)
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+def get_export_rows(queryset):
+    # accepted students of courses from the best score, rows are read by chunks instead of loading all of them
+    return queryset.filter(status=ACCEPTED).order_by(
+        'active_course__course__name', 'active_course_id', '-score', 'id'
+    ).values_list(*(lookup for lookup, title in EXPORT_COLUMNS)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def chunked(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Echo:
+    # csv.writer returns the written line instead of keeping it
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    # BOM, so Excel opens the file in UTF-8
+    yield ('\ufeff' + writer.writerow([title for lookup, title in EXPORT_COLUMNS])).encode()
+    for chunk in chunked(rows):
+        yield ''.join(writer.writerow(row) for row in chunk).encode()
+
+
+class StreamBuffer:
+    # unseekable file for zipfile (entries get data descriptors), written bytes are taken away by pop
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)):
+        return '<c t="n"><v>{}</v></c>'.format(value)
+    return '<c t="inlineStr"><is><t>{}</t></is></c>'.format(escape(str(value)))
+
+
+def xlsx_rows(rows):
+    return ''.join('<row>{}</row>'.format(''.join(xlsx_cell(value) for value in row)) for row in rows)
+
+
+def stream_xlsx(rows):
+    # minimal workbook of one sheet with inline strings, the sheet is compressed and sent by chunks of rows
+    buffer = StreamBuffer()
+    archive = zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED)
+    for name, content in XLSX_PARTS:
+        archive.writestr(name, XML_DECLARATION + content)
+    with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+        sheet.write('{}<worksheet xmlns="{}"><sheetData>{}'.format(
+            XML_DECLARATION, XLSX_NAMESPACE, xlsx_rows([[title for lookup, title in EXPORT_COLUMNS]])).encode())
+        yield buffer.pop()
+        for chunk in chunked(rows):
+            sheet.write(xlsx_rows(chunk).encode())
+            yield buffer.pop()
+        sheet.write(b'</sheetData></worksheet>')
+    archive.close()
+    yield buffer.pop()
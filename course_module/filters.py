@@ -1,8 +1,8 @@
-from datetime import datetime
+from django_filters import FilterSet, filters, ModelChoiceFilter, NumberFilter, BooleanFilter, CharFilter
 
-from django_filters import FilterSet, filters, ModelChoiceFilter, NumberFilter, BooleanFilter
-
-from course_module.models import CourseContainer, CourseRequest, ContainerToCourse, Course, ContainerToGroup
+from course_module.models import CourseContainer, CourseRequest, ContainerToCourse, ContainerToGroup, CourseHead, \
+    CourseStatistics, CourseToInstitute
+from course_module.search import search_course_ids
 from study_group_module.models import StudyGroup
 
 
@@ -26,13 +26,9 @@ class RequestFilterSet(FilterSet):
         }
 
     def filter_by_course(self, queryset, name, value):
-        today = datetime.today()
-        if today.month > 8:
-            groups = StudyGroup.objects.filter(start_year=datetime(today.year - value + 1, 9, 1))
-        else:
-            groups = StudyGroup.objects.filter(start_year=datetime(today.year - value, 9, 1))
-        courses = Course.objects.filter(containers__container_group_relations__group__in=groups)
-        return queryset.filter(active_course__course__in=courses)
+        groups = StudyGroup.objects.of_study_year(value).values('id')
+        courses = ContainerToCourse.objects.filter(container__container_group_relations__group__in=groups)
+        return queryset.filter(active_course__course__in=courses.values('course_id'))
 
     def filter_by_container(self, queryset, name, value):
         return queryset.filter(active_course__container=value)
@@ -41,27 +37,42 @@ class RequestFilterSet(FilterSet):
 class CourseCardFilterSet(FilterSet):
     my = BooleanFilter(method='filter_my')
     course = NumberFilter(method='filter_by_course')
+    q = CharFilter(method='filter_search')
 
     class Meta:
         model = ContainerToCourse
-        fields = ('course__institutes', 'container', 'container__status', 'my')
+        fields = ('course__institutes', 'container', 'container__status', 'my', 'q')
+
+    # filters use IN over subqueries, so cards aren't multiplied by joins and don't need DISTINCT
 
     def filter_by_course(self, queryset, name, value):
-        # ToDo: когда в модели будет храниться номер курса, переделать
-        today = datetime.today()
-        if today.month > 8:
-            groups = StudyGroup.objects.filter(start_year=datetime(today.year - value + 1, 9, 1))
-        else:
-            groups = StudyGroup.objects.filter(start_year=datetime(today.year - value, 9, 1))
-        return queryset.filter(
-            container__container_group_relations__group__in=groups
-        ).distinct()
+        groups = StudyGroup.objects.of_study_year(value).values('id')
+        containers = ContainerToGroup.objects.filter(group__in=groups).values('container_id')
+        return queryset.filter(container__in=containers)
+
+    def filter_search(self, queryset, name, value):
+        # full-text index of courses, see course_module.search
+        return queryset.filter(course__in=search_course_ids(value))
 
     def filter_my(self, queryset, name, value):
         if not value:
             return queryset
-        if self.request.user.role is 'student':
-            return queryset.filter(container__groups=self.request.user.student_profile.group).distinct()
-        if self.request.user.role is 'professor':
-            return queryset.filter(heads=self.request.user).distinct()
+        if self.request.user.role == 'student':
+            containers = ContainerToGroup.objects.filter(group=self.request.user.student_profile.group_id)
+            return queryset.filter(container__in=containers.values('container_id'))
+        if self.request.user.role == 'professor':
+            return queryset.filter(id__in=CourseHead.objects.filter(curator=self.request.user).values('course_id'))
         return queryset
+
+
+class StatisticsFilterSet(FilterSet):
+    container = NumberFilter(field_name='course__container')
+    institute = NumberFilter(method='filter_by_institute')
+
+    class Meta:
+        model = CourseStatistics
+        fields = ('container', 'institute')
+
+    def filter_by_institute(self, queryset, name, value):
+        courses = CourseToInstitute.objects.filter(institute=value).values('course_id')
+        return queryset.filter(course__course__in=courses)
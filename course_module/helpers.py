@@ -1,26 +1,289 @@
-from django.db import transaction
+import random
+import time
+
+from django.db import connection, transaction, OperationalError
+from django.db.models import F, Q, Exists, OuterRef, Subquery, Max, Count, IntegerField
+from django.db.models.functions import Coalesce
 from rest_framework.exceptions import ValidationError
 
-from eITIS.enums import SUBMITTED, ACCEPTED, REJECTED
+from course_module.cache import bump_container_versions
+from course_module.models import CourseRequest, ContainerToCourse
+from eITIS.enums import SUBMITTED, ACCEPTED, REJECTED, RANKED_ALLOCATION
+from user_module.models import User
+
+# how many times a submission is repeated when its transaction fails on a lock conflict
+# (deadlock on PostgreSQL, "database is locked" on SQLite)
+SUBMIT_ATTEMPTS = 5
+
+ACCEPT_DECISION = 'accept'
+REJECT_DECISION = 'reject'
+
+CONTAINER_REQUEST_EXISTS = 'Студент уже записан на курс из этого набора'
+
+
+def get_next_waiting_request(active_course):
+    # head of the waitlist: submitted request with the highest score snapshot
+    return active_course.requests.filter(status=SUBMITTED).order_by('-score', 'id').first()
+
+
+def get_pending_requests(course_ids, limit):
+    # the best `limit` requests of waitlist of each course in one query,
+    # the correlated subquery is served by course_request_rank_idx
+    best = CourseRequest.objects.filter(active_course=OuterRef('active_course'), status=SUBMITTED).order_by(
+        '-score', 'id').values('id')[:limit]
+    return CourseRequest.objects.filter(active_course__in=course_ids, status=SUBMITTED,
+                                        id__in=Subquery(best)).order_by('active_course', '-score', 'id')
+
+
+def get_last_accepted_request(active_course):
+    return active_course.requests.filter(status=ACCEPTED).order_by('score', '-id').first()
+
+
+def get_request_position(active_course_id, student):
+    # place of student's request among submitted and accepted requests of the course ranked by score snapshot,
+    # requests ahead are counted by course_request_rank_idx
+    request = CourseRequest.objects.filter(active_course_id=active_course_id, student=student).values(
+        'id', 'status', 'score').first()
+    if request is None or request['status'] == REJECTED:
+        return request, None
+    ahead = CourseRequest.objects.filter(
+        Q(score__gt=request['score']) | Q(score=request['score'], id__lt=request['id']),
+        active_course_id=active_course_id, status__in=(SUBMITTED, ACCEPTED),
+    ).count()
+    return request, ahead + 1
+
+
+def accepts_instantly(active_course):
+    # in container with ranked allocation requests wait for the allocation of the whole container
+    return active_course.instant_accept and active_course.container.allocation_mode != RANKED_ALLOCATION
+
+
+def promote_next_request(active_course):
+    if not accepts_instantly(active_course):
+        return None
+    next_request = get_next_waiting_request(active_course)
+    if next_request:
+        next_request.status = ACCEPTED
+        next_request.save()
+    return next_request
+
+
+def submit_request(validated_data):
+    if transaction.get_connection().in_atomic_block:
+        # the transaction belongs to caller, so it can't be repeated here
+        return allocate_request(validated_data)
+    for attempt in range(SUBMIT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return allocate_request(validated_data)
+        except OperationalError:
+            if attempt + 1 == SUBMIT_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def lock_course(active_course):
+    courses = ContainerToCourse.objects.select_related('container')
+    if connection.features.has_select_for_update_of:
+        return courses.select_for_update(of=('self',)).get(pk=active_course.pk)
+    if connection.features.has_select_for_update:
+        return courses.select_for_update().get(pk=active_course.pk)
+    # without row locks (SQLite) the transaction starts with a write, so it waits
+    # for the database lock instead of failing when its read lock is upgraded
+    ContainerToCourse.objects.filter(pk=active_course.pk).update(status=F('status'))
+    return courses.get(pk=active_course.pk)
+
+
+def lock_student(student):
+    # requests of one student to different courses of a container take different course locks,
+    # so they are serialized by the row of student (on SQLite the write of lock_course holds the database)
+    if connection.features.has_select_for_update:
+        User.objects.select_for_update().filter(pk=student.pk).values_list('pk', flat=True).get()
+
+
+def get_container_requests(student, container_id):
+    return CourseRequest.objects.filter(student=student, active_course__container=container_id).exclude(
+        status=REJECTED)
+
+
+def check_priority(validated_data):
+    student_requests = get_container_requests(validated_data['student'],
+                                              validated_data['active_course'].container_id)
+    if validated_data.get('priority') is None:
+        # the next rank after the lowest chosen one, gaps left by deleted requests aren't reused
+        last_priority = student_requests.aggregate(last=Max('priority'))['last'] or 0
+        return dict(validated_data, priority=last_priority + 1)
+    if student_requests.filter(priority=validated_data['priority']).exists():
+        raise ValidationError({'priority': 'Этот приоритет уже указан в другой заявке'})
+    return validated_data
+
+
+def lock_request_course(request):
+    # the course isn't read before the lock, so the transaction still starts with a write
+    request.active_course = lock_course(ContainerToCourse(pk=request.active_course_id))
+    return request.active_course
+
+
+def allocate_request(validated_data):
+    # lock of the course row serializes submissions to it,
+    # seats are counted and taken in one short critical section
+    active_course = lock_course(validated_data['active_course'])
+    validated_data = dict(validated_data, active_course=active_course,
+                          score=validated_data['student'].student_profile.score)
+    # requests of student in the container are checked again under the lock,
+    # concurrent requests could pass validation before each other were saved
+    lock_student(validated_data['student'])
+    if active_course.container.allocation_mode == RANKED_ALLOCATION:
+        validated_data = check_priority(validated_data)
+    elif get_container_requests(validated_data['student'], active_course.container_id).exists():
+        raise ValidationError(CONTAINER_REQUEST_EXISTS)
+    if not accepts_instantly(active_course):
+        return CourseRequest.objects.create(**validated_data)
+
+    # if course is already full
+    if active_course.quantity and active_course.quantity <= active_course.accepted_count:
+        last_request = get_last_accepted_request(active_course)
+        # if nobody has lower score, then student waits for a free seat
+        if not last_request or last_request.score >= validated_data['score']:
+            return CourseRequest.objects.create(**validated_data)
+        # otherwise student with the lowest score returns to the waitlist
+        last_request.status = SUBMITTED
+        last_request.save()
+    return CourseRequest.objects.create(**validated_data, status=ACCEPTED)
+
+
+def accept_waiting(active_course, seats=None):
+    # the best of waitlist take given number of seats, or all of waitlist is accepted
+    waiting = CourseRequest.objects.filter(active_course=active_course, status=SUBMITTED)
+    if seats is not None:
+        waiting = CourseRequest.objects.filter(pk__in=waiting.order_by('-score', 'id').values('pk')[:seats])
+    accepted = waiting.update(status=ACCEPTED)
+    ContainerToCourse.objects.filter(pk=active_course.pk).shift_counters(accepted=accepted)
+    ContainerToCourse.objects.filter(pk=active_course.pk).rebuild_statistics()
+    bump_container_versions([active_course.container_id])
+    return accepted
+
+
+def return_to_waitlist(active_course, seats):
+    # accepted requests with the lowest scores lose given number of seats
+    accepted = CourseRequest.objects.filter(active_course=active_course, status=ACCEPTED)
+    returned = CourseRequest.objects.filter(
+        pk__in=accepted.order_by('score', '-id').values('pk')[:seats]
+    ).update(status=SUBMITTED)
+    ContainerToCourse.objects.filter(pk=active_course.pk).shift_counters(accepted=-returned)
+    ContainerToCourse.objects.filter(pk=active_course.pk).rebuild_statistics()
+    bump_container_versions([active_course.container_id])
+    return returned
+
+
+def rebalance_course(active_course):
+    # accepted requests of instant-accept course have to match its quantity,
+    # each direction of change is one set-based statement
+    if not accepts_instantly(active_course):
+        return 0
+    if active_course.quantity is None:
+        return accept_waiting(active_course)
+    if active_course.quantity > active_course.accepted_count:
+        return accept_waiting(active_course, active_course.quantity - active_course.accepted_count)
+    if active_course.quantity < active_course.accepted_count:
+        return -return_to_waitlist(active_course, active_course.accepted_count - active_course.quantity)
+    return 0
+
+
+def get_free_seats(course_ids):
+    # free seats of instant-accept courses with waitlists, None for courses without quantity;
+    # accepted requests are counted from rows, counters aren't rebuilt yet
+    accepted = CourseRequest.objects.filter(active_course=OuterRef('pk'), status=ACCEPTED).order_by().values(
+        'active_course').annotate(count=Count('id')).values('count')
+    courses = ContainerToCourse.objects.filter(pk__in=course_ids, instant_accept=True).exclude(
+        container__allocation_mode=RANKED_ALLOCATION).annotate(
+        has_waiting_requests=Exists(CourseRequest.objects.filter(active_course=OuterRef('pk'), status=SUBMITTED)),
+        accepted_now=Coalesce(Subquery(accepted, output_field=IntegerField()), 0),
+    ).filter(has_waiting_requests=True)
+    return {course_id: None if quantity is None else quantity - accepted_now
+            for course_id, quantity, accepted_now in courses.values_list('pk', 'quantity', 'accepted_now')
+            if quantity is None or quantity > accepted_now}
+
+
+def promote_waiting_requests(course_ids):
+    # seats freed in instant-accept courses are given to their waitlists by one read and one update,
+    # counters and statistics are rebuilt by the caller
+    seats = get_free_seats(course_ids)
+    if not seats:
+        return 0
+    if None in seats.values():
+        waiting = CourseRequest.objects.filter(active_course__in=list(seats), status=SUBMITTED).order_by(
+            'active_course', '-score', 'id')
+    else:
+        waiting = get_pending_requests(list(seats), max(seats.values()))
+    taken = dict.fromkeys(seats, 0)
+    promoted = []
+    for request_id, course_id in waiting.values_list('id', 'active_course_id'):
+        if seats[course_id] is None or taken[course_id] < seats[course_id]:
+            taken[course_id] += 1
+            promoted.append(request_id)
+    return CourseRequest.objects.filter(pk__in=promoted).update(status=ACCEPTED)
+
+
+@transaction.atomic
+def decide_requests(queryset, decisions):
+    requests = queryset.filter(id__in=[item['id'] for item in decisions]).select_related('active_course')
+    requests = {request.id: request for request in requests}
+    course_ids = {request.active_course_id for request in requests.values()}
+    if connection.features.has_select_for_update:
+        list(ContainerToCourse.objects.filter(pk__in=course_ids).select_for_update().values_list('pk'))
+
+    # students who are already accepted to a course of the container, checked for the whole batch at once
+    accepted_students = set(CourseRequest.objects.filter(
+        status=ACCEPTED,
+        student_id__in={request.student_id for request in requests.values()},
+        active_course__container_id__in={request.active_course.container_id for request in requests.values()},
+    ).values_list('student_id', 'active_course__container_id'))
+
+    results, changed = [], []
+    for item in decisions:
+        request = requests.get(item['id'])
+        result = dict(item)
+        results.append(result)
+        if request is None:
+            result['error'] = 'Заявка не найдена'
+            continue
+        student_in_container = (request.student_id, request.active_course.container_id)
+        if item['decision'] == ACCEPT_DECISION and request.status != ACCEPTED:
+            if student_in_container in accepted_students:
+                result['error'] = 'Студент уже записан на курс из этого набора'
+                continue
+            accepted_students.add(student_in_container)
+            request.status = ACCEPTED
+            changed.append(request)
+        elif item['decision'] == REJECT_DECISION and request.status != REJECTED:
+            if request.status == ACCEPTED:
+                accepted_students.discard(student_in_container)
+            request.status = REJECTED
+            changed.append(request)
+        result['status'] = request.status
+
+    CourseRequest.objects.bulk_update(changed, ['status'])
+    promote_waiting_requests(course_ids)
+    ContainerToCourse.objects.filter(pk__in=course_ids).rebuild_counters()
+    ContainerToCourse.objects.filter(pk__in=course_ids).rebuild_statistics()
+    return results
 
 
 @transaction.atomic
 def delete_request(request):
+    lock_request_course(request)
     # if request.active_course has instant_accept and it was accepted
-    if request.active_course.instant_accept and request.status == ACCEPTED:
-        # get submitted requests, order by score, if exists first, then
-        # change it's status on accepted
-        submitted_requests = request.active_course.requests.filter(status=SUBMITTED)
-        if len(submitted_requests):
-            submitted_requests = sorted(submitted_requests, key=lambda obj: -obj.student.student_profile.score)
-            submitted_requests[0].status = ACCEPTED
-            submitted_requests[0].save()
+    if request.status == ACCEPTED:
+        # accept the first request of the waitlist, if any
+        promote_next_request(request.active_course)
     
     request.delete()
 
 
 @transaction.atomic
 def accept_request(request):
+    lock_request_course(request)
     student = request.student
     container = request.active_course.container
     student_containers_to_courses = student.student_course_requests.filter(status=ACCEPTED,
@@ -34,15 +297,13 @@ def accept_request(request):
 
 @transaction.atomic
 def reject_request(request):
+    # the lock keeps concurrent rejections from promoting the same waiting request twice
+    lock_request_course(request)
+    was_accepted = request.status == ACCEPTED
     request.status = REJECTED
     request.save()
-    # if request.active_course has instant_accept
-    if request.active_course.instant_accept:
-        # get submitted requests, order by score, if exists first, then
-        # change it's status on accepted
-        submitted_requests = request.active_course.requests.filter(status=SUBMITTED)
-        if len(submitted_requests):
-            submitted_requests = sorted(submitted_requests, key=lambda obj: -obj.student.student_profile.score)
-            submitted_requests[0].status = ACCEPTED
-            submitted_requests[0].save()
+    # if request.active_course has instant_accept and the request took a seat
+    if was_accepted:
+        # accept the first request of the waitlist, if any
+        promote_next_request(request.active_course)
     return request
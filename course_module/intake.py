@@ -0,0 +1,78 @@
+import json
+from datetime import timedelta
+
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from course_module.models import RequestTicket
+from course_module.serializers import ExtendedCourseRequestSerializer
+from eITIS.enums import TICKET_PENDING, TICKET_PROCESSING, TICKET_DONE, TICKET_FAILED
+
+# ticket claimed by a worker which didn't finish it in this time is given to another worker
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def get_claimable_tickets(now, using_connection=connection):
+    tickets = RequestTicket.objects.filter(
+        Q(status=TICKET_PENDING) | Q(status=TICKET_PROCESSING, claimed_at__lt=now - CLAIM_TIMEOUT)
+    )
+    if using_connection.features.has_select_for_update_skip_locked:
+        # parallel workers skip tickets claimed by each other, only rows of tickets are locked
+        # (profiles of the ordering are on the nullable side of outer join)
+        tickets = tickets.select_for_update(skip_locked=True, of=('self',))
+    # students with higher score go first, so instant-accept courses don't accept and then
+    # return to waitlist the ones with lower score within the same rush
+    return tickets.order_by('-student__student_profile__score', 'id')
+
+
+@transaction.atomic
+def claim_tickets(batch_size):
+    now = timezone.now()
+    ticket_ids = list(get_claimable_tickets(now).values_list('id', flat=True)[:batch_size])
+    RequestTicket.objects.filter(id__in=ticket_ids).update(status=TICKET_PROCESSING, claimed_at=now)
+    return list(RequestTicket.objects.filter(id__in=ticket_ids).select_related(
+        'student__student_profile', 'active_course__container'
+    ).order_by('-student__student_profile__score', 'id'))
+
+
+@transaction.atomic
+def process_ticket(ticket):
+    # the request and the result of ticket are saved together, so a ticket is never left
+    # in processing with its request already created
+    data = dict(active_course_id=ticket.active_course_id, message=ticket.message)
+    if ticket.priority is not None:
+        data['priority'] = ticket.priority
+    serializer = ExtendedCourseRequestSerializer(data=data, context=dict(student=ticket.student))
+    try:
+        with transaction.atomic():
+            if serializer.is_valid():
+                ticket.request = serializer.save()
+                ticket.status = TICKET_DONE
+            else:
+                ticket.status = TICKET_FAILED
+                ticket.errors = json.dumps(serializer.errors, ensure_ascii=False)
+    except ValidationError as error:
+        # checks repeated under the lock of submission
+        ticket.status = TICKET_FAILED
+        ticket.errors = json.dumps(serializers.as_serializer_error(error), ensure_ascii=False)
+    except DatabaseError as error:
+        ticket.status = TICKET_FAILED
+        ticket.errors = json.dumps({'non_field_errors': [str(error)]}, ensure_ascii=False)
+    ticket.processed_at = timezone.now()
+    ticket.save(update_fields=['request', 'status', 'errors', 'processed_at'])
+    return ticket
+
+
+def process_queue(batch_size=100):
+    # drains the queue by batches, returns the number of processed tickets
+    processed = 0
+    while True:
+        tickets = claim_tickets(batch_size)
+        if not tickets:
+            return processed
+        for ticket in tickets:
+            process_ticket(ticket)
+        processed += len(tickets)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from course_module.allocation import allocate_containers
+
+
+class Command(BaseCommand):
+    help = 'Assigns students to courses of containers with ranked allocation by their priorities and scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--container', type=int, action='append', dest='containers',
+                            help='Allocate only given container (can be repeated)')
+        parser.add_argument('--workers', type=int, default=1, help='Number of processes solving containers')
+
+    def handle(self, *args, **options):
+        results = allocate_containers(options['containers'], workers=options['workers'])
+        for container_id, accepted in results.items():
+            self.stdout.write('Container {}: {} requests accepted'.format(container_id, accepted))
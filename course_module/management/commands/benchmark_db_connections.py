@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from course_module.models import ContainerToCourse
+from eITIS.db_pool import get_pool_stats, close_pools
+
+
+class Command(BaseCommand):
+    help = ('Compares latency of requests to the configured database which connect on every request, '
+            'keep persistent connections (CONN_MAX_AGE) and take connections from the pool of eITIS/db_pool.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests of every kind of connections')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent workers')
+        parser.add_argument('--pool-size', type=int, default=None, help='Size of the pool, --threads by default')
+
+    def handle(self, *args, **options):
+        settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+        vendor = 'postgresql' if connections[DEFAULT_DB_ALIAS].vendor == 'postgresql' else 'sqlite3'
+        modes = (
+            ('new connections', dict(settings_dict, CONN_MAX_AGE=0)),
+            ('persistent connections', dict(settings_dict, CONN_MAX_AGE=None)),
+            ('pool', dict(settings_dict, ENGINE='eITIS.db_backends.' + vendor, CONN_MAX_AGE=0,
+                          POOL=dict(SIZE=options['pool_size'] or options['threads']))),
+        )
+        for name, mode_settings in modes:
+            alias = 'benchmark_' + name.split()[0]
+            connections.databases[alias] = mode_settings
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                timings = sorted(executor.map(lambda index: self.request(alias), range(options['requests'])))
+            self.stdout.write('{}: {:.2f} ms per request, p95 {:.2f} ms'.format(
+                name, sum(timings) / len(timings) * 1000, timings[int(len(timings) * 0.95)] * 1000))
+        stats = get_pool_stats().get('benchmark_pool')
+        if stats:
+            self.stdout.write('pool: ' + ', '.join('{} {}'.format(stat, value)
+                                                   for stat, value in sorted(stats.items())))
+        close_pools()
+
+    def request(self, alias):
+        # request_started and request_finished close connections of requests like handlers of Django do
+        started_at = time.perf_counter()
+        signals.request_started.send(sender=self.__class__)
+        try:
+            list(ContainerToCourse.objects.using(alias).with_card_details()[:20])
+        finally:
+            signals.request_finished.send(sender=self.__class__)
+        return time.perf_counter() - started_at
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from course_module.models import ContainerToCourse, CourseRequest
+from course_module.simulation import EnrollmentSimulation
+
+
+class Command(BaseCommand):
+    help = ('Seeds courses and requests into the configured database and compares time of cards and requests '
+            'lists built by serializers and by .values() rows (COURSE_VALUES_LISTS)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Courses and requests in lists')
+        parser.add_argument('--repeat', type=int, default=5, help='Best time of this number of calls is taken')
+        parser.add_argument('--keep', action='store_true', help="Don't delete the seeded data")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        simulation = EnrollmentSimulation(students=rows, courses=rows, containers=1, quantity=rows)
+        self.stdout.write('Seeding {}...'.format(simulation.tag))
+        simulation.seed()
+        try:
+            relations = [relation for relation, professor in simulation.relations]
+            CourseRequest.objects.bulk_create([
+                CourseRequest(student=student, active_course=relation, score=0)
+                for student, relation in zip(simulation.students, relations)
+            ])
+            ContainerToCourse.objects.filter(pk__in=[relation.id for relation in relations]).rebuild_counters()
+            client = APIClient()
+            client.force_authenticate(simulation.deanery)
+            data = dict(container=simulation.containers[0].id, limit=rows)
+            for name, url in (('cards', reverse('containertocourse-list')),
+                              ('requests', reverse('courserequest-list'))):
+                timings = [self.measure(client, url, data, values, options['repeat']) for values in (False, True)]
+                self.stdout.write('{}: serializers {:.1f} ms, values {:.1f} ms per 1000 rows, {:.1f}x faster'.format(
+                    name, timings[0], timings[1], timings[0] / timings[1] if timings[1] else 0))
+        finally:
+            if not options['keep']:
+                simulation.cleanup()
+
+    def measure(self, client, url, data, values, repeat):
+        best = None
+        # responses of cards would come from the course cache, which may be shared with other processes,
+        # so it is turned off instead of being cleared
+        with override_settings(COURSE_VALUES_LISTS=values, COURSE_CACHE_ALIAS=None):
+            for i in range(repeat):
+                started_at = time.perf_counter()
+                response = client.get(url, data=data)
+                elapsed = time.perf_counter() - started_at
+                per_thousand = elapsed * 1000 / max(len(response.data['results']), 1) * 1000
+                best = per_thousand if best is None else min(best, per_thousand)
+        return best
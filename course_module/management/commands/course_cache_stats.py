@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from course_module.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = 'Shows hits and misses of the course cards and containers response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset statistics after showing them')
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        self.stdout.write('hits: {hits}, misses: {misses}, hit ratio: {hit_ratio:.1%}'.format(**stats))
+        if options['reset']:
+            reset_stats()
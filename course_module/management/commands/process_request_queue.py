@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from course_module.intake import process_queue
+
+
+class Command(BaseCommand):
+    help = 'Turns queued request tickets into course requests (COURSE_REQUESTS_INTAKE_QUEUE mode)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_queue(options['batch_size'])
+            if processed:
+                self.stdout.write('Processed {} tickets'.format(processed))
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from course_module.models import ContainerToCourse
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds accepted_count and active_count of courses from their requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--container', type=int, action='append', dest='containers',
+                            help='Rebuild only courses of given container (can be repeated)')
+
+    def handle(self, *args, **options):
+        queryset = ContainerToCourse.objects.all()
+        if options['containers']:
+            queryset = queryset.filter(container_id__in=options['containers'])
+        updated = queryset.rebuild_counters()
+        self.stdout.write('Rebuilt counters of {} courses'.format(updated))
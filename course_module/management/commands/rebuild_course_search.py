@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from course_module.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds full-text search index of courses (name, description and requirements)'
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write('Rebuilt search index of courses')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from course_module.models import ContainerToCourse
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds statistics of courses (counts of requests by status, average and cutoff score) from requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--container', type=int, action='append', dest='containers',
+                            help='Rebuild only courses of given container (can be repeated)')
+
+    def handle(self, *args, **options):
+        queryset = ContainerToCourse.objects.all()
+        if options['containers']:
+            queryset = queryset.filter(container_id__in=options['containers'])
+        created = queryset.create_missing_statistics()
+        updated = queryset.rebuild_statistics()
+        self.stdout.write('Rebuilt statistics of {} courses ({} created)'.format(updated, created))
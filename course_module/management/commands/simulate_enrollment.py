@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from course_module.simulation import EnrollmentSimulation
+
+
+class Command(BaseCommand):
+    help = ('Seeds students, courses and containers into the configured database, replays concurrent '
+            'submissions, withdrawals and decisions against the API views and reports latency, '
+            'SQL queries per call and capacity violations')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--courses', type=int, default=20)
+        parser.add_argument('--containers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--quantity', type=int, default=10, help='Seats of each course')
+        parser.add_argument('--instant-ratio', type=float, default=0.5,
+                            help='Part of courses with instant accept')
+        parser.add_argument('--withdraw-ratio', type=float, default=0.1,
+                            help='Part of requests withdrawn by students')
+        parser.add_argument('--decide-ratio', type=float, default=0.3,
+                            help='Part of requests accepted or rejected by professors')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help="Don't delete the seeded data")
+
+    def handle(self, *args, **options):
+        simulation = EnrollmentSimulation(
+            students=options['students'], courses=options['courses'], containers=options['containers'],
+            threads=options['threads'], quantity=options['quantity'], instant_ratio=options['instant_ratio'],
+            withdraw_ratio=options['withdraw_ratio'], decide_ratio=options['decide_ratio'], seed=options['seed'])
+        self.stdout.write('Seeding {}...'.format(simulation.tag))
+        simulation.seed()
+        try:
+            elapsed = simulation.run()
+            for line in simulation.report(elapsed):
+                self.stdout.write(line)
+        finally:
+            if not options['keep']:
+                simulation.cleanup()
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_scores(apps, schema_editor):
+    CourseRequest = apps.get_model('course_module', 'CourseRequest')
+    StudentProfile = apps.get_model('user_module', 'StudentProfile')
+    profile_score = StudentProfile.objects.filter(user_id=OuterRef('student_id')).values('score')[:1]
+    CourseRequest.objects.update(score=Coalesce(Subquery(profile_score), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_module', '0004_studentprofile_score'),
+        ('course_module', '0005_auto_20181225_2001'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courserequest',
+            name='score',
+            field=models.FloatField(blank=True, default=0.0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='courserequest',
+            index=models.Index(fields=['active_course', 'status', '-score', 'id'], name='course_request_rank_idx'),
+        ),
+    ]
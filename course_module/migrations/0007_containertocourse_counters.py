@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from eITIS.enums import ACCEPTED, REJECTED
+
+
+def fill_counters(apps, schema_editor):
+    ContainerToCourse = apps.get_model('course_module', 'ContainerToCourse')
+    CourseRequest = apps.get_model('course_module', 'CourseRequest')
+    requests = CourseRequest.objects.filter(active_course=OuterRef('pk')).order_by().values('active_course')
+    accepted = requests.filter(status=ACCEPTED).annotate(count=Count('id')).values('count')
+    active = requests.exclude(status=REJECTED).annotate(count=Count('id')).values('count')
+    ContainerToCourse.objects.update(accepted_count=Coalesce(Subquery(accepted), 0),
+                                     active_count=Coalesce(Subquery(active), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_module', '0006_courserequest_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='containertocourse',
+            name='accepted_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='containertocourse',
+            name='active_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_module', '0007_containertocourse_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coursecontainer',
+            name='allocation_mode',
+            field=models.SmallIntegerField(choices=[(0, 'Заявки рассматриваются по одной'),
+                                                    (1, 'Распределение по приоритетам студентов')], default=0),
+        ),
+        migrations.AddField(
+            model_name='courserequest',
+            name='priority',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
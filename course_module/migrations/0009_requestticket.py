@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+import course_module.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('course_module', '0008_ranked_allocation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestTicket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField(blank=True)),
+                ('priority', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('status', models.SmallIntegerField(choices=[(0, 'В очереди'), (1, 'Обрабатывается'),
+                                                             (2, 'Заявка создана'),
+                                                             (3, 'Заявка отклонена при проверке')], default=0)),
+                ('errors', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('active_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                    related_name='tickets', to='course_module.ContainerToCourse')),
+                ('request', models.OneToOneField(blank=True, null=True,
+                                                 on_delete=django.db.models.deletion.SET_NULL,
+                                                 related_name='ticket', to='course_module.CourseRequest')),
+                ('student', models.ForeignKey(limit_choices_to=course_module.models.get_only_students_q,
+                                              on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='request_tickets', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Очередь заявок на курсы по выбору',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='requestticket',
+            index=models.Index(fields=['status', 'id'], name='request_ticket_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+from eITIS.enums import SUBMITTED, ACCEPTED, REJECTED
+
+
+def fill_statistics(apps, schema_editor):
+    ContainerToCourse = apps.get_model('course_module', 'ContainerToCourse')
+    CourseRequest = apps.get_model('course_module', 'CourseRequest')
+    CourseStatistics = apps.get_model('course_module', 'CourseStatistics')
+    CourseStatistics.objects.bulk_create([CourseStatistics(course_id=course_id) for course_id in
+                                          ContainerToCourse.objects.values_list('pk', flat=True)])
+    requests = CourseRequest.objects.filter(active_course=OuterRef('pk')).order_by().values('active_course')
+    accepted = requests.filter(status=ACCEPTED)
+
+    def aggregate(queryset, function):
+        return Subquery(queryset.annotate(value=function).values('value'))
+
+    CourseStatistics.objects.update(
+        submitted_count=Coalesce(aggregate(requests.filter(status=SUBMITTED), Count('id')), 0),
+        accepted_count=Coalesce(aggregate(accepted, Count('id')), 0),
+        rejected_count=Coalesce(aggregate(requests.filter(status=REJECTED), Count('id')), 0),
+        accepted_score_sum=Coalesce(aggregate(accepted, Sum('score')), 0.0),
+        cutoff_score=aggregate(accepted, Min('score')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('course_module', '0009_requestticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStatistics',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='course_module.ContainerToCourse')),
+                ('submitted_count', models.PositiveIntegerField(default=0)),
+                ('accepted_count', models.PositiveIntegerField(default=0)),
+                ('rejected_count', models.PositiveIntegerField(default=0)),
+                ('accepted_score_sum', models.FloatField(default=0.0)),
+                ('cutoff_score', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Статистика курсов по выбору',
+            },
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+from django.db import migrations
+
+# the SQL is kept here, so the migration doesn't change with the code of course_module/search.py
+POSTGRESQL_FORWARD = (
+    'ALTER TABLE course_module_course ADD COLUMN search_vector tsvector',
+    """CREATE FUNCTION course_module_course_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('russian', coalesce(NEW.requirements, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER course_module_course_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, description, requirements ON course_module_course
+    FOR EACH ROW EXECUTE PROCEDURE course_module_course_search_vector()""",
+    'UPDATE course_module_course SET name = name',
+    'CREATE INDEX course_module_course_search_idx ON course_module_course USING gin (search_vector)',
+)
+
+POSTGRESQL_BACKWARD = (
+    'DROP TRIGGER course_module_course_search_vector_update ON course_module_course',
+    'DROP FUNCTION course_module_course_search_vector()',
+    'ALTER TABLE course_module_course DROP COLUMN search_vector',
+)
+
+SQLITE_FORWARD = (
+    """CREATE VIRTUAL TABLE course_module_course_fts USING fts5(name, description, requirements,
+    content='course_module_course', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER course_module_course_fts_insert AFTER INSERT ON course_module_course BEGIN
+        INSERT INTO course_module_course_fts(rowid, name, description, requirements)
+        VALUES (new.id, new.name, new.description, new.requirements);
+    END""",
+    """CREATE TRIGGER course_module_course_fts_delete AFTER DELETE ON course_module_course BEGIN
+        INSERT INTO course_module_course_fts(course_module_course_fts, rowid, name, description, requirements)
+        VALUES ('delete', old.id, old.name, old.description, old.requirements);
+    END""",
+    """CREATE TRIGGER course_module_course_fts_update AFTER UPDATE ON course_module_course BEGIN
+        INSERT INTO course_module_course_fts(course_module_course_fts, rowid, name, description, requirements)
+        VALUES ('delete', old.id, old.name, old.description, old.requirements);
+        INSERT INTO course_module_course_fts(rowid, name, description, requirements)
+        VALUES (new.id, new.name, new.description, new.requirements);
+    END""",
+    "INSERT INTO course_module_course_fts(course_module_course_fts) VALUES ('rebuild')",
+)
+
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS course_module_course_fts_insert',
+    'DROP TRIGGER IF EXISTS course_module_course_fts_delete',
+    'DROP TRIGGER IF EXISTS course_module_course_fts_update',
+    'DROP TABLE course_module_course_fts',
+)
+
+
+def get_index_statements(vendor, forward=True):
+    if vendor == 'postgresql':
+        return POSTGRESQL_FORWARD if forward else POSTGRESQL_BACKWARD
+    return SQLITE_FORWARD if forward else SQLITE_BACKWARD
+
+
+def create_search_index(apps, schema_editor):
+    for statement in get_index_statements(schema_editor.connection.vendor):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in get_index_statements(schema_editor.connection.vendor, forward=False):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+    # the index isn't a field of Course, so on SQLite migrations which rebuild the table of courses
+    # drop its triggers and have to create them again (check course_module.W001 warns about missing ones)
+    dependencies = [
+        ('course_module', '0010_coursestatistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
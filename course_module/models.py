@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import Q, F, Count, Sum, Min, OuterRef, Subquery, Prefetch
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import Permission
 from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 
-from user_module.models import User
+from course_module.cache import bump_versions, bump_container_versions, STRUCTURE_VERSION, REQUESTS_VERSION
+from user_module.models import User, StudentProfile
 from study_group_module.models import Institute, StudyGroup
 from eITIS.enums import *
 import datetime
@@ -28,6 +32,12 @@ def get_only_professors_q():
     return Q(groups__name='Professors')
 
 
+def get_counters_delta(old_status, new_status):
+    # status None stands for a request which doesn't exist (not created yet or deleted)
+    return dict(accepted=int(new_status == ACCEPTED) - int(old_status == ACCEPTED),
+                active=int(new_status not in (None, REJECTED)) - int(old_status not in (None, REJECTED)))
+
+
 class Course(models.Model):
     name = models.CharField(max_length=100, unique=True)
     requirements = models.TextField(blank=True)
@@ -62,6 +72,7 @@ class CourseContainer(models.Model):
     start_date = models.DateTimeField()
     expiration_date = models.DateTimeField()
     status = models.SmallIntegerField(choices=CONTAINER_STATUS, default=0)
+    allocation_mode = models.SmallIntegerField(choices=ALLOCATION_MODE, default=DIRECT_ALLOCATION)
 
     class Meta:
         unique_together = ('name', 'created_at')
@@ -90,12 +101,58 @@ class CourseRequest(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, limit_choices_to=get_only_students_q,
                                 on_delete=models.CASCADE, related_name='student_course_requests')
     active_course = models.ForeignKey("ContainerToCourse", on_delete=models.CASCADE, related_name='requests')
+    # snapshot of student_profile.score, the waitlist of a course is ranked by it
+    score = models.FloatField(blank=True)
+    # rank of the course among student's choices in container with ranked allocation, 1 is the most wanted
+    priority = models.PositiveSmallIntegerField(null=True, blank=True)
     # course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='course_requests')
     # container = models.ForeignKey(CourseContainer, on_delete=models.CASCADE, related_name='container_requests')
 
     class Meta:
         unique_together = ('student', 'active_course')
         verbose_name_plural = "Заявки на курсы по выбору"
+        indexes = [
+            models.Index(fields=['active_course', 'status', '-score', 'id'], name='course_request_rank_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        instance._saved_active_course_id = instance.__dict__.get('active_course_id')
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._saved_status = self.status
+        self._saved_active_course_id = self.active_course_id
+
+    def save(self, *args, **kwargs):
+        if self.score is None:
+            self.score = StudentProfile.objects.filter(user_id=self.student_id).values_list(
+                'score', flat=True).first() or 0.0
+        saved_status = getattr(self, '_saved_status', None)
+        saved_course_id = getattr(self, '_saved_active_course_id', None)
+        if saved_course_id is None or saved_course_id == self.active_course_id:
+            transitions = [(self.active_course_id, saved_status, self.status)]
+        else:
+            # request moved to another course leaves the old one and comes to the new one
+            transitions = [(saved_course_id, saved_status, None), (self.active_course_id, None, self.status)]
+        # counters of the courses are changed in the same transaction as the request itself
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            for course_id, old_status, new_status in transitions:
+                ContainerToCourse.objects.filter(pk=course_id).shift_counters(
+                    **get_counters_delta(old_status, new_status))
+                CourseStatistics.objects.filter(pk=course_id).shift(old_status, new_status, self.score)
+            if len(transitions) == 1:
+                bump_container_versions([self.active_course.container_id])
+            else:
+                bump_container_versions(ContainerToCourse.objects.filter(
+                    pk__in=[course_id for course_id, old_status, new_status in transitions]
+                ).values_list('container_id', flat=True))
+        self._saved_status = self.status
+        self._saved_active_course_id = self.active_course_id
 
     def clean(self):
         if not self.student.has_perm('user_module.student_permissions'):
@@ -116,6 +173,69 @@ class CourseRequest(models.Model):
             if REQUEST_STATUS[index][0] == self.status:
                 return REQUEST_STATUS[index][1]
 
+    @receiver(post_save, sender=StudentProfile)
+    def update_score_snapshot(sender, instance, **kwargs):
+        requests = CourseRequest.objects.filter(student_id=instance.user_id)
+        requests.exclude(status=REJECTED).update(score=instance.score)
+        ContainerToCourse.objects.filter(pk__in=requests.filter(status=ACCEPTED).values(
+            'active_course_id')).rebuild_statistics()
+        bump_student_versions(instance.user_id)
+
+
+def get_heads_prefetch(lookup='heads'):
+    # heads in order of ids, the same as course_module.values reads them
+    return Prefetch(lookup, queryset=User.objects.order_by('id'))
+
+
+class ContainerToCourseQuerySet(models.QuerySet):
+    def with_card_details(self, course=True, container=True, heads=True):
+        # everything RelationSerializer shows
+        related = [name for name, shown in (('course', course), ('container', container)) if shown]
+        queryset = self.select_related(*related) if related else self
+        return queryset.prefetch_related(get_heads_prefetch()) if heads else queryset
+
+    # every change of requests goes through counters, so they bump the version of requests
+    def shift_counters(self, accepted=0, active=0):
+        bump_versions(REQUESTS_VERSION)
+        changes = {}
+        if accepted:
+            changes['accepted_count'] = F('accepted_count') + accepted
+        if active:
+            changes['active_count'] = F('active_count') + active
+        if not changes:
+            return 0
+        return self.update(**changes)
+
+    def rebuild_counters(self):
+        bump_versions(REQUESTS_VERSION)
+        bump_container_versions(self.values_list('container_id', flat=True))
+        requests = CourseRequest.objects.filter(active_course=OuterRef('pk')).order_by().values('active_course')
+        accepted = requests.filter(status=ACCEPTED).annotate(count=Count('id')).values('count')
+        active = requests.exclude(status=REJECTED).annotate(count=Count('id')).values('count')
+        return self.update(accepted_count=Coalesce(Subquery(accepted), 0),
+                           active_count=Coalesce(Subquery(active), 0))
+
+    def create_missing_statistics(self):
+        return len(CourseStatistics.objects.bulk_create([
+            CourseStatistics(course_id=course_id)
+            for course_id in self.filter(statistics__isnull=True).values_list('pk', flat=True)
+        ]))
+
+    def rebuild_statistics(self):
+        requests = CourseRequest.objects.filter(active_course=OuterRef('pk')).order_by().values('active_course')
+        accepted = requests.filter(status=ACCEPTED)
+
+        def aggregate(queryset, function):
+            return Subquery(queryset.annotate(value=function).values('value'))
+
+        return CourseStatistics.objects.filter(course__in=self.values('pk')).update(
+            submitted_count=Coalesce(aggregate(requests.filter(status=SUBMITTED), Count('id')), 0),
+            accepted_count=Coalesce(aggregate(accepted, Count('id')), 0),
+            rejected_count=Coalesce(aggregate(requests.filter(status=REJECTED), Count('id')), 0),
+            accepted_score_sum=Coalesce(aggregate(accepted, Sum('score')), 0.0),
+            cutoff_score=aggregate(accepted, Min('score')),
+        )
+
 
 class ContainerToCourse(models.Model):
     container = models.ForeignKey(CourseContainer,
@@ -126,19 +246,25 @@ class ContainerToCourse(models.Model):
     status = models.SmallIntegerField(choices=ACTIVITY_TO_CONTAINER_STATUS, default=0)
     min_quantity = models.SmallIntegerField(default=15)
     quantity = models.SmallIntegerField(null=True, blank=True)
+    # maintained by CourseRequest.save and deletion, rebuilt by rebuild_course_counters command
+    accepted_count = models.PositiveIntegerField(default=0, editable=False)
+    active_count = models.PositiveIntegerField(default=0, editable=False)
 
-    @property
-    def accepted_requests(self):
-        return CourseRequest.objects.filter(active_course=self, status=ACCEPTED).count()
+    objects = ContainerToCourseQuerySet.as_manager()
 
-    @property
-    def all_requests(self):
-        return CourseRequest.objects.filter(active_course=self).exclude(status=REJECTED).count()
+    COUNTER_FIELDS = ('accepted_count', 'active_count')
 
     class Meta:
         unique_together = ('course', 'container')
         verbose_name_plural = "Связь курсов по выбору и наборов"
 
+    def save(self, *args, **kwargs):
+        # don't overwrite counters with the values loaded together with instance
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return "{}, {}. Статус: {}".format(str(self.course), str(self.container), str(self.readable_status))
 
@@ -148,6 +274,88 @@ class ContainerToCourse(models.Model):
             if ACTIVITY_TO_CONTAINER_STATUS[index][0] == self.status:
                 return ACTIVITY_TO_CONTAINER_STATUS[index][1]
 
+    @receiver(post_delete, sender=CourseRequest)
+    def release_counters(sender, instance, **kwargs):
+        ContainerToCourse.objects.filter(pk=instance.active_course_id).shift_counters(
+            **get_counters_delta(getattr(instance, '_saved_status', instance.status), None))
+        CourseStatistics.objects.filter(pk=instance.active_course_id).shift(
+            getattr(instance, '_saved_status', instance.status), None, instance.score)
+        bump_container_versions([instance.active_course.container_id])
+
+
+class CourseStatisticsQuerySet(models.QuerySet):
+    def shift(self, old_status, new_status, score):
+        # one transition of request with given score snapshot, status None stands for no request
+        changes = {}
+        for status, field in ((SUBMITTED, 'submitted_count'), (ACCEPTED, 'accepted_count'),
+                              (REJECTED, 'rejected_count')):
+            delta = int(new_status == status) - int(old_status == status)
+            if delta:
+                changes[field] = F(field) + delta
+        if new_status != old_status and ACCEPTED in (new_status, old_status):
+            delta = 1 if new_status == ACCEPTED else -1
+            changes['accepted_score_sum'] = F('accepted_score_sum') + delta * (score or 0.0)
+            # the lowest accepted score is found by course_request_rank_idx
+            changes['cutoff_score'] = Subquery(CourseRequest.objects.filter(
+                active_course=OuterRef('pk'), status=ACCEPTED).order_by('score').values('score')[:1])
+        if not changes:
+            return 0
+        return self.update(**changes)
+
+
+class CourseStatistics(models.Model):
+    # summary of requests of the course for deanery, maintained by CourseRequest.save and deletion,
+    # rebuilt by rebuild_course_statistics command
+    course = models.OneToOneField(ContainerToCourse, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='statistics')
+    submitted_count = models.PositiveIntegerField(default=0)
+    accepted_count = models.PositiveIntegerField(default=0)
+    rejected_count = models.PositiveIntegerField(default=0)
+    accepted_score_sum = models.FloatField(default=0.0)
+    # the lowest score among accepted requests
+    cutoff_score = models.FloatField(null=True, blank=True)
+
+    objects = CourseStatisticsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = "Статистика курсов по выбору"
+
+    @property
+    def average_score(self):
+        return self.accepted_score_sum / self.accepted_count if self.accepted_count else None
+
+    @receiver(post_save, sender=ContainerToCourse)
+    def create_statistics(sender, instance, created, **kwargs):
+        if created:
+            CourseStatistics.objects.create(course=instance)
+
+
+class RequestTicket(models.Model):
+    # submission waiting in the intake queue, it becomes CourseRequest when a worker processes it
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, limit_choices_to=get_only_students_q,
+                                on_delete=models.CASCADE, related_name='request_tickets')
+    active_course = models.ForeignKey(ContainerToCourse, on_delete=models.CASCADE, related_name='tickets')
+    message = models.TextField(blank=True)
+    priority = models.PositiveSmallIntegerField(null=True, blank=True)
+    status = models.SmallIntegerField(choices=TICKET_STATUS, default=TICKET_PENDING)
+    request = models.OneToOneField(CourseRequest, null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='ticket')
+    # validation errors as JSON, when the ticket failed
+    errors = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Очередь заявок на курсы по выбору"
+        indexes = [
+            models.Index(fields=['status', 'id'], name='request_ticket_queue_idx'),
+        ]
+
+    def __str__(self):
+        return "Ticket of {} to {}, status: {}".format(str(self.student), str(self.active_course),
+                                                       self.get_status_display())
+
 
 class CourseHead(models.Model):
     curator = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET(get_sentinel_user),
@@ -182,3 +390,31 @@ class CourseMediaFilesLinks(models.Model):
     class Meta:
         verbose_name_plural = "Ссылки на медиа курсов"
         get_latest_by = "uploading_date"
+
+
+def bump_structure_version(sender, **kwargs):
+    bump_versions(STRUCTURE_VERSION)
+
+
+for model in (Course, CourseToInstitute, CourseContainer, ContainerToCourse, CourseHead, ContainerToGroup, StudyGroup):
+    post_save.connect(bump_structure_version, sender=model)
+    post_delete.connect(bump_structure_version, sender=model)
+
+
+def bump_student_versions(student_id):
+    # students with their profiles are shown in requests
+    bump_versions(REQUESTS_VERSION)
+    bump_container_versions(CourseRequest.objects.filter(student_id=student_id).values_list(
+        'active_course__container_id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def bump_user_versions(sender, instance, update_fields=None, **kwargs):
+    # heads are shown in course cards and students in requests, logins and passwords aren't shown
+    if update_fields is not None and not update_fields & {'first_name', 'last_name', 'middle_name', 'username',
+                                                          'email', 'photo'}:
+        return
+    if instance.role == 'professor':
+        bump_versions(STRUCTURE_VERSION)
+    elif instance.role == 'student':
+        bump_student_versions(instance.id)
@@ -0,0 +1,28 @@
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(CursorPagination):
+    # pages continue after the last id of previous page, so deep pages cost the same as the first one.
+    # Total count is computed only for the first page, ?count=false skips it there too
+    ordering = 'id'
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.cursor_query_param) is None and \
+                request.query_params.get(self.count_query_param) not in ('false', 'False', '0'):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,76 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+# full-text index of name, description and requirements of courses, both indexes are maintained by triggers
+# of migration 0011: tsvector column with GIN index on PostgreSQL and FTS5 table on SQLite (tests and local runs)
+SEARCH_TABLE = 'course_module_course_fts'
+
+# triggers which keep the index in sync with course_module_course
+SEARCH_TRIGGERS = {
+    'postgresql': ('course_module_course_search_vector_update',),
+    'sqlite': tuple('{}_{}'.format(SEARCH_TABLE, event) for event in ('insert', 'delete', 'update')),
+}
+
+
+def get_search_sql(query, rank=True):
+    # sql of ids (and ranks, bigger is more relevant) of courses which match all words of query by prefixes
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None, []
+    if connection.vendor == 'postgresql':
+        tsquery = ' & '.join('{}:*'.format(word) for word in words)
+        columns = "id, ts_rank(search_vector, to_tsquery('russian', %s))" if rank else 'id'
+        sql = "SELECT {} FROM course_module_course WHERE search_vector @@ to_tsquery('russian', %s)"
+        return sql.format(columns), [tsquery] * (2 if rank else 1)
+    # name weighs more than description and requirements, like weights of tsvector
+    columns = 'rowid, -bm25({}, 10.0, 2.0, 1.0)'.format(SEARCH_TABLE) if rank else 'rowid'
+    sql = 'SELECT {1} FROM {0} WHERE {0} MATCH %s'.format(SEARCH_TABLE, columns)
+    return sql, [' '.join('"{}"*'.format(word) for word in words)]
+
+
+class SearchSubquery(RawSQL):
+    # lookup `in` puts its subquery in parentheses itself
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def search_course_ids(query):
+    # value of course__in, the subquery is served by the index
+    sql, params = get_search_sql(query, rank=False)
+    return [] if sql is None else SearchSubquery(sql, params)
+
+
+def rank_courses(query):
+    sql, params = get_search_sql(query)
+    if sql is None:
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+
+
+def rebuild_search_index():
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('UPDATE course_module_course SET name = name')
+        else:
+            cursor.execute("INSERT INTO {0}({0}) VALUES ('rebuild')".format(SEARCH_TABLE))
+
+
+def get_missing_search_triggers():
+    # migrations which rebuild course_module_course on SQLite drop its triggers,
+    # nothing is missing while migration 0011 isn't applied yet
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            columns = connection.introspection.get_table_description(cursor, 'course_module_course')
+            if 'search_vector' not in {column.name for column in columns}:
+                return []
+            cursor.execute('SELECT tgname FROM pg_trigger WHERE NOT tgisinternal')
+        else:
+            if SEARCH_TABLE not in connection.introspection.table_names(cursor):
+                return []
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {name for name, in cursor.fetchall()}
+    return [name for name in SEARCH_TRIGGERS[connection.vendor] if name not in existing]
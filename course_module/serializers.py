@@ -1,30 +1,39 @@
-from django.db import transaction
+import json
+
+from django.db import transaction, IntegrityError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueTogetherValidator
 
-from eITIS.enums import ACCEPTED, REJECTED, SUBMITTED, CLOSED
+from course_module.cache import bump_versions, STRUCTURE_VERSION
+from course_module.helpers import (submit_request, lock_course, rebalance_course, check_priority,
+                                   get_container_requests, ACCEPT_DECISION, REJECT_DECISION,
+                                   CONTAINER_REQUEST_EXISTS)
+from eITIS.enums import CLOSED, RANKED_ALLOCATION
+from eITIS.serializers import DynamicFieldsMixin
 from user_module.serializers import UserSerializer, StudentSerializer
-from .models import Course, ContainerToCourse, CourseRequest, CourseMediaFilesLinks, CourseContainer
+from .models import Course, ContainerToCourse, CourseRequest, CourseMediaFilesLinks, CourseContainer, RequestTicket, \
+    CourseStatistics
 
 
 # COURSES
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = '__all__'
 
 
-class ShortCourseSerializer(serializers.ModelSerializer):
+class ShortCourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = ('id', 'name', 'logo_path')
+        values_lookups = {'logo_path': 'logo'}
 
 
 # COURSE CONTAINERS
 
-class ShortCourseContainerSerializer(serializers.ModelSerializer):
+class ShortCourseContainerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseContainer
         fields = ('id', 'name', 'start_date', 'expiration_date', 'status')
@@ -32,7 +41,10 @@ class ShortCourseContainerSerializer(serializers.ModelSerializer):
 
 # CONTAINER TO COURSE (RELATIONS)
 
-class ShortRelationSerializer(serializers.ModelSerializer):
+class ShortRelationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    accepted_requests = serializers.IntegerField(source='accepted_count', read_only=True)
+    all_requests = serializers.IntegerField(source='active_count', read_only=True)
+
     class Meta:
         model = ContainerToCourse
         fields = ('id', 'status', 'quantity', 'min_quantity', 'accepted_requests', 'all_requests', 'instant_accept')
@@ -59,52 +71,36 @@ class ProfessorUpdateRelationSerializer(serializers.ModelSerializer):
         read_only_fields = ('container', 'course', 'heads', 'status', 'min_quantity',)
 
     def validate_quantity(self, quantity):
-        if quantity < self.instance.min_quantity:
+        if quantity is not None and quantity < self.instance.min_quantity:
             raise ValidationError('Количество не может быть меньше минимума, установленного деканатом')
         return quantity
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        lock_course(instance)
         ContainerToCourse.objects.filter(id=instance.id).update(**validated_data)
-        if (validated_data.get('instant_accept', None) and not instance.instant_accept or
-                validated_data.get('instant_accept', None) and instance.instant_accept and (
-                        validated_data.get('quantity', 0) > instance.quantity if instance.quantity else 0
-                )):
-            not_accepted_requests = CourseRequest.objects.filter(active_course=instance, status=SUBMITTED)
-            not_accepted_requests = sorted(not_accepted_requests, key=lambda obj: -obj.student.student_profile.score)
-            count = validated_data.get('quantity') - CourseRequest.objects.filter(active_course=instance,
-                                                                                  status=ACCEPTED)
-            for request in not_accepted_requests[:count]:
-                request.status = ACCEPTED
-                request.save()
-        if (instance.instant_accept and validated_data.get('instant_accept', True) and
-            instance.quantity if instance.quantity else 0 > validated_data.get(
-                'quantity', instance.quantity)):
-            accepted_requests = CourseRequest.objects.filter(active_course=instance, status=ACCEPTED)
-            accepted_requests = sorted(accepted_requests, key=lambda obj: -obj.student.student_profile.score)
-            count = len(accepted_requests) - validated_data.get('quantity')
-            for request in accepted_requests[:count]:
-                request.status = SUBMITTED
-                request.save()
+        rebalance_course(ContainerToCourse.objects.select_related('container').get(pk=instance.pk))
+        bump_versions(STRUCTURE_VERSION)
         return ContainerToCourse.objects.get(pk=instance.pk)
 
 
 # REQUESTS
 
-class ShortCourseRequestSerializer(serializers.ModelSerializer):
+class ShortCourseRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseRequest
         fields = ('status', 'message')
 
 
-class CourseRequestSerializer(serializers.ModelSerializer):
+class CourseRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     student = StudentSerializer(read_only=True)
     active_course_id = serializers.PrimaryKeyRelatedField(source='active_course', write_only=True,
                                                           queryset=ContainerToCourse.objects.all())
     
     class Meta:
         model = CourseRequest
-        fields = ('id', 'status', 'active_course_id', 'student', 'message', 'created_at', 'active_course')
+        fields = ('id', 'status', 'active_course_id', 'student', 'message', 'created_at', 'active_course',
+                  'priority')
         read_only_fields = ('status', 'student')
         validators = (
             UniqueTogetherValidator(
@@ -115,8 +111,8 @@ class CourseRequestSerializer(serializers.ModelSerializer):
     
     def to_internal_value(self, data):
         data = super().to_internal_value(data)
-        request = self.context['request']
-        data['student'] = request.user
+        # queue worker passes the student of ticket, API takes the user of request
+        data['student'] = self.context['student'] if 'student' in self.context else self.context['request'].user
         return data
     
     def validate_active_course_id(self, active_course):
@@ -125,62 +121,138 @@ class CourseRequestSerializer(serializers.ModelSerializer):
         return active_course
 
     def validate(self, attrs):
-        if CourseRequest.objects.filter(student=attrs['student'],
-                                        active_course__container=attrs['active_course'].container
-                                        ).exclude(status=REJECTED).exists():
-            raise ValidationError('Студент уже записан на курс из этого набора')
+        container = attrs['active_course'].container
+        if container.allocation_mode == RANKED_ALLOCATION:
+            # student ranks several courses of container, they are assigned all at once later,
+            # missing priority is given under the lock of submission
+            if attrs.get('priority') is not None:
+                check_priority(attrs)
+            return attrs
+        if get_container_requests(attrs['student'], container.id).exists():
+            raise ValidationError(CONTAINER_REQUEST_EXISTS)
+        attrs['priority'] = None
         return attrs
 
     def create(self, validated_data):
-        course_details = validated_data['active_course']
-        if not course_details.instant_accept:
-            instance = CourseRequest.objects.create(**validated_data)
-            return instance
-        
-        # if automatic accept:
-        # get already accepted requests
-        accepted_requests = course_details.requests.filter(status=ACCEPTED)
-        
-        # if course is already full
-        if course_details.quantity and (
-                course_details.quantity <= accepted_requests.count()
-        ):
-            # get all requests, order by student score
-            requests = sorted(course_details.requests.filter(status=ACCEPTED),
-                              key=lambda obj: -obj.student.student_profile.score)
-            
-            last_request = requests[-1]
-            # if last score < score of this student, then change status of that request on default,
-            # create this request with status accepted
-            if last_request.student.student_profile.score < validated_data['student'].student_profile.score:
-                last_request.status = SUBMITTED
-                last_request.save()
-                instance = CourseRequest.objects.create(**validated_data, status=ACCEPTED)
-                return instance
-        # if course is not full
-        if not course_details.quantity or course_details.quantity > accepted_requests.count():
-            # then instantly accept request
-            instance = CourseRequest.objects.create(**validated_data, status=ACCEPTED)
-            return instance
-        
-        # in other cases save request with default status
-        instance = CourseRequest.objects.create(**validated_data)
-        return instance
+        try:
+            return submit_request(validated_data)
+        except IntegrityError:
+            # concurrent request of the same student to the same course was saved first
+            raise ValidationError('Заявка на этот курс уже подана')
 
 
 class ExtendedCourseRequestSerializer(CourseRequestSerializer):
     active_course = RelationSerializer(read_only=True, required=False)
 
 
-class RequestExistenceSerializer(serializers.ModelSerializer):
+class RequestTicketSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    active_course_id = serializers.PrimaryKeyRelatedField(source='active_course',
+                                                          queryset=ContainerToCourse.objects.all())
+    request_status = serializers.IntegerField(source='request.status', read_only=True, default=None)
+    errors = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RequestTicket
+        fields = ('id', 'status', 'active_course_id', 'message', 'priority', 'request', 'request_status',
+                  'errors', 'created_at', 'processed_at')
+        read_only_fields = ('status', 'request', 'created_at', 'processed_at')
+
+    def get_errors(self, ticket):
+        return json.loads(ticket.errors) if ticket.errors else None
+
+
+class RequestDecisionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    decision = serializers.ChoiceField(choices=(ACCEPT_DECISION, REJECT_DECISION))
+
+
+class RequestExistenceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseRequest
         fields = ('status',)
 
 
+# STATISTICS
+
+class ShortCourseStatisticsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    average_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = CourseStatistics
+        fields = ('submitted_count', 'accepted_count', 'rejected_count', 'average_score', 'cutoff_score')
+
+
+class CourseStatisticsSerializer(ShortCourseStatisticsSerializer):
+    name = serializers.CharField(source='course.course.name', read_only=True)
+    container = serializers.IntegerField(source='course.container_id', read_only=True)
+
+    class Meta:
+        model = CourseStatistics
+        fields = ('course', 'name', 'container') + ShortCourseStatisticsSerializer.Meta.fields
+
+
+class InstituteStatisticsSerializer(serializers.Serializer):
+    # rows of CourseStatistics summed up by institutes of their courses
+    institute = serializers.IntegerField()
+    name = serializers.CharField()
+    courses = serializers.IntegerField()
+    submitted_count = serializers.IntegerField(source='submitted')
+    accepted_count = serializers.IntegerField(source='accepted')
+    rejected_count = serializers.IntegerField(source='rejected')
+    average_score = serializers.SerializerMethodField()
+    cutoff_score = serializers.FloatField(source='cutoff')
+
+    def get_average_score(self, row):
+        return row['score_sum'] / row['accepted'] if row['accepted'] else None
+
+
+# DASHBOARD
+
+class DashboardCardSerializer(RelationSerializer):
+    # card of professor with statistics of requests and the best waiting requests (pending_requests of view)
+    statistics = ShortCourseStatisticsSerializer(read_only=True)
+    pending = CourseRequestSerializer(source='pending_requests', many=True, read_only=True)
+
+    class Meta:
+        model = ContainerToCourse
+        fields = RelationSerializer.Meta.fields + ('statistics', 'pending')
+
+
+# ENROLLMENT
+
+class EnrollmentCardSerializer(ShortRelationSerializer):
+    class Meta:
+        model = ContainerToCourse
+        fields = ShortRelationSerializer.Meta.fields + ('course', 'heads')
+
+    heads = UserSerializer(many=True)
+    course = ShortCourseSerializer()
+
+
+class EnrollmentContainerSerializer(ShortCourseContainerSerializer):
+    cards = EnrollmentCardSerializer(source='enrollment_cards', many=True, read_only=True)
+
+    class Meta:
+        model = CourseContainer
+        fields = ShortCourseContainerSerializer.Meta.fields + ('allocation_mode', 'cards')
+
+
+class EnrollmentRequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    # cards of requests are in containers of the payload, so requests refer to them by ids
+    class Meta:
+        model = CourseRequest
+        fields = ('id', 'status', 'active_course', 'message', 'created_at', 'priority')
+
+
+class EnrollmentSerializer(serializers.Serializer):
+    user = StudentSerializer(read_only=True)
+    containers = EnrollmentContainerSerializer(many=True, read_only=True)
+    requests = EnrollmentRequestSerializer(many=True, read_only=True)
+
+
 # MEDIA
 
-class CourseMediaSerializer(serializers.ModelSerializer):
+class CourseMediaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseMediaFilesLinks
         fields = ('name', 'path',)
@@ -0,0 +1,216 @@
+import math
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from course_module.models import Course, CourseContainer, ContainerToCourse, ContainerToGroup, CourseHead, \
+    CourseRequest
+from eITIS.enums import ACCEPTED, REJECTED, BAKALAVR
+from study_group_module.models import Institute, Faculty, StudyGroup
+from user_module.models import User, StudentProfile
+
+
+class EnrollmentSimulation:
+    # seeds students, courses and containers, then replays the enrollment rush against the API views
+
+    def __init__(self, students=200, courses=20, containers=2, threads=8, quantity=10, instant_ratio=0.5,
+                 withdraw_ratio=0.1, decide_ratio=0.3, seed=None):
+        self.students_count = students
+        self.courses_count = courses
+        self.containers_count = containers
+        self.threads_count = threads
+        self.quantity = quantity
+        self.instant_ratio = instant_ratio
+        self.withdraw_ratio = withdraw_ratio
+        self.decide_ratio = decide_ratio
+        self.random = random.Random(seed)
+        self.tag = 'sim{}'.format(int(time.time() * 1000))
+        self.samples = defaultdict(list)
+
+    # SEEDING
+
+    def seed(self):
+        self.institute = Institute.objects.create(name=self.tag)
+        faculty = Faculty.objects.create(name=self.tag, spec_number=self.tag[-20:], institute=self.institute)
+        self.groups = [StudyGroup.objects.create(group_number='{}-{}'.format(self.tag[-10:], index),
+                                                 start_year=timezone.now().date(), study_form=BAKALAVR,
+                                                 faculty=faculty)
+                       for index in range(self.containers_count)]
+        self.deanery = self.make_user('deanery', 0, 'Deanery_Workers')
+        self.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+
+        self.students = [self.make_user('student', index, 'Students') for index in range(self.students_count)]
+        profiles = []
+        for index, profile in enumerate(StudentProfile.objects.filter(user__in=self.students).order_by('user_id')):
+            profile.group = self.groups[index % self.containers_count]
+            profile.score = round(self.random.uniform(50, 100), 2)
+            profiles.append(profile)
+        StudentProfile.objects.bulk_update(profiles, ['group', 'score'])
+
+        now = timezone.now()
+        self.containers = []
+        for index, group in enumerate(self.groups):
+            container = CourseContainer.objects.create(name='{}-{}'.format(self.tag, index), created_by=self.deanery,
+                                                       start_date=now, expiration_date=now + timedelta(days=7))
+            ContainerToGroup.objects.create(group=group, container=container)
+            self.containers.append(container)
+
+        self.relations = []
+        for index in range(self.courses_count):
+            course = Course.objects.create(name='{}-{}'.format(self.tag, index))
+            relation = ContainerToCourse.objects.create(
+                container=self.containers[index % self.containers_count], course=course,
+                instant_accept=self.random.random() < self.instant_ratio,
+                quantity=self.quantity, min_quantity=min(self.quantity, 15))
+            professor = self.make_user('professor', index, 'Professors')
+            CourseHead.objects.create(curator=professor, course=relation)
+            self.relations.append((relation, professor))
+
+    def make_user(self, role, index, group_name):
+        user = User.objects.create(username='{}-{}-{}'.format(self.tag, role, index))
+        user.groups.add(Group.objects.get(name=group_name))
+        return user
+
+    def cleanup(self):
+        CourseContainer.objects.filter(name__startswith=self.tag).delete()
+        Course.objects.filter(name__startswith=self.tag).delete()
+        for user in User.objects.filter(username__startswith=self.tag):
+            user.delete()
+        StudyGroup.objects.filter(faculty__institute__name=self.tag).delete()
+        Institute.objects.filter(name=self.tag).delete()
+
+    # WORKLOAD
+
+    def call(self, kind, user, method, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            started_at = time.perf_counter()
+            try:
+                status_code = getattr(client, method)(url, data=data, format='json').status_code
+            except Exception:
+                # test client raises exceptions of views instead of returning 500
+                status_code = 500
+            latency = time.perf_counter() - started_at
+        self.samples[kind].append((latency, len(queries), status_code))
+
+    def run_phase(self, operations):
+        tasks = queue.Queue()
+        for operation in operations:
+            tasks.put(operation)
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        operation = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    operation()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for i in range(self.threads_count)]
+        started_at = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started_at
+
+    def rush_operations(self):
+        cards_url = reverse('containertocourse-list')
+        requests_url = reverse('courserequest-list')
+        courses_by_container = defaultdict(list)
+        for relation, professor in self.relations:
+            courses_by_container[relation.container_id].append(relation)
+        operations = []
+        for index, student in enumerate(self.students):
+            container = self.containers[index % self.containers_count]
+            relation = self.random.choice(courses_by_container[container.id])
+
+            def operation(student=student, container=container, relation=relation):
+                self.call('browse', student, 'get', cards_url, dict(container=container.id))
+                self.call('submit', student, 'post', requests_url, dict(active_course_id=relation.id))
+            operations.append(operation)
+        return operations
+
+    def settle_operations(self):
+        operations = []
+        requests = list(CourseRequest.objects.filter(
+            active_course__in=[relation for relation, professor in self.relations]
+        ).select_related('student', 'active_course'))
+        professors = {relation.id: professor for relation, professor in self.relations}
+        for request in requests:
+            if self.random.random() < self.withdraw_ratio:
+                url = reverse('courserequest-detail', kwargs=dict(pk=request.id))
+                operations.append(lambda request=request, url=url: self.call(
+                    'withdraw', request.student, 'delete', url))
+            elif self.random.random() < self.decide_ratio:
+                # manual acceptance overrides seats of instant-accept course, so those are only rejected
+                actions = ['courserequest-reject-request']
+                if not request.active_course.instant_accept:
+                    actions.append('courserequest-accept-request')
+                action = self.random.choice(actions)
+                operations.append(lambda request=request, action=action: self.call(
+                    'decide', professors[request.active_course_id], 'post', reverse(action), dict(id=request.id)))
+        self.random.shuffle(operations)
+        return operations
+
+    def run(self):
+        elapsed = self.run_phase(self.rush_operations())
+        elapsed += self.run_phase(self.settle_operations())
+        return elapsed
+
+    # REPORT
+
+    def capacity_violations(self):
+        relations = ContainerToCourse.objects.filter(
+            pk__in=[relation.id for relation, professor in self.relations]
+        ).annotate(
+            accepted=Count('requests', filter=Q(requests__status=ACCEPTED)),
+            active=Count('requests', filter=~Q(requests__status=REJECTED)),
+        )
+        violations = []
+        for relation in relations:
+            if relation.instant_accept and relation.quantity is not None and relation.accepted > relation.quantity:
+                violations.append('{}: {} accepted of {} seats'.format(relation.id, relation.accepted,
+                                                                      relation.quantity))
+            if (relation.accepted_count, relation.active_count) != (relation.accepted, relation.active):
+                violations.append('{}: counters ({}, {}) != ({}, {})'.format(
+                    relation.id, relation.accepted_count, relation.active_count, relation.accepted, relation.active))
+        return violations
+
+    @staticmethod
+    def percentile(values, percent):
+        return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+    def report(self, elapsed):
+        lines = []
+        total = sum(len(samples) for samples in self.samples.values())
+        lines.append('{} calls in {:.2f}s, {:.1f} calls/s, {} threads'.format(
+            total, elapsed, total / elapsed if elapsed else 0, self.threads_count))
+        lines.append('{:<10}{:>7}{:>7}{:>7}{:>10}{:>10}{:>10}{:>10}'.format(
+            'call', 'count', '4xx', '5xx', 'p50 ms', 'p95 ms', 'p99 ms', 'queries'))
+        for kind, samples in sorted(self.samples.items()):
+            latencies = sorted(sample[0] * 1000 for sample in samples)
+            lines.append('{:<10}{:>7}{:>7}{:>7}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}'.format(
+                kind, len(samples), sum(1 for sample in samples if 400 <= sample[2] < 500),
+                sum(1 for sample in samples if sample[2] >= 500),
+                self.percentile(latencies, 50), self.percentile(latencies, 95), self.percentile(latencies, 99),
+                sum(sample[1] for sample in samples) / len(samples)))
+        violations = self.capacity_violations()
+        lines.append('capacity violations: {}'.format(len(violations)))
+        lines.extend('  ' + violation for violation in violations)
+        return lines
@@ -0,0 +1,139 @@
+import random
+from unittest import mock
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from course_module import allocation
+from course_module.allocation import solve_container
+from course_module.helpers import submit_request
+from course_module.models import CourseContainer, ContainerToCourse, CourseRequest, CourseHead
+from eITIS.enums import ACCEPTED, REJECTED, SUBMITTED, RANKED_ALLOCATION
+from user_module.models import User
+
+
+class SolveContainerTestCase(SimpleTestCase):
+    def test_students_get_best_possible_course_by_score(self):
+        seats = {1: (1, 0), 2: (1, 0)}
+        preferences = [
+            (5, 10, [(1, 101), (2, 102)]),
+            (9, 11, [(1, 111), (2, 112)]),
+            (7, 12, [(1, 121), (2, 122)]),
+        ]
+        self.assertEqual({111, 122}, solve_container((seats, preferences)))
+
+    def test_course_without_min_quantity_is_cancelled(self):
+        seats = {1: (None, 2), 2: (None, 1)}
+        preferences = [
+            (5, 10, [(1, 101), (2, 102)]),
+            (9, 11, [(2, 112), (1, 111)]),
+        ]
+        # course 1 gets one student only, so both of them go to course 2
+        self.assertEqual({102, 112}, solve_container((seats, preferences)))
+
+    def test_large_container(self):
+        courses_count, students_count = 40, 5000
+        seats = {course_id: (150, 15) for course_id in range(courses_count)}
+        preferences = []
+        generator = random.Random(0)
+        for student_id in range(students_count):
+            options = generator.sample(range(courses_count), 5)
+            preferences.append((generator.random() * 100, student_id,
+                                [(course_id, student_id * courses_count + course_id) for course_id in options]))
+        accepted = solve_container((seats, preferences))
+        taken = Counter(request_id % courses_count for request_id in accepted)
+        self.assertTrue(all(count <= 150 for count in taken.values()))
+        self.assertEqual(len(accepted), len({request_id // courses_count for request_id in accepted}))
+
+
+class RankedAllocationAPITestCase(APITestCase):
+    def setUp(self):
+        self.container = mommy.make(CourseContainer, allocation_mode=RANKED_ALLOCATION)
+        self.relations = [mommy.make(ContainerToCourse, container=self.container, instant_accept=True,
+                                     quantity=1, min_quantity=1) for i in range(2)]
+        self.students = []
+        for score in (5, 9):
+            student = mommy.make(User)
+            student.groups.add(Group.objects.get(name='Students'))
+            student.student_profile.score = score
+            student.student_profile.save()
+            self.students.append(student)
+        self.url = reverse('courserequest-list')
+
+    def submit(self, student, relation, **data):
+        self.client.force_login(student)
+        return self.client.post(self.url, data=dict(active_course_id=relation.id, **data))
+
+    def test_student_can_rank_several_courses(self):
+        self.assertEqual(status.HTTP_201_CREATED, self.submit(self.students[0], self.relations[0]).status_code)
+        self.assertEqual(status.HTTP_201_CREATED, self.submit(self.students[0], self.relations[1]).status_code)
+        requests = CourseRequest.objects.filter(student=self.students[0]).order_by('priority')
+        self.assertEqual([(self.relations[0].id, 1, SUBMITTED), (self.relations[1].id, 2, SUBMITTED)],
+                         [(obj.active_course_id, obj.priority, obj.status) for obj in requests])
+
+    def test_cant_use_same_priority_twice(self):
+        self.submit(self.students[0], self.relations[0], priority=1)
+        response = self.submit(self.students[0], self.relations[1], priority=1)
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertTrue('priority' in response.data)
+        # concurrent request could pass validation before the first one was saved
+        with self.assertRaises(ValidationError):
+            submit_request(dict(student=self.students[0], active_course=self.relations[1], priority=1))
+
+    def test_priority_follows_the_last_one(self):
+        self.submit(self.students[0], self.relations[0], priority=3)
+        self.assertEqual(status.HTTP_201_CREATED, self.submit(self.students[0], self.relations[1]).status_code)
+        self.assertEqual(4, CourseRequest.objects.get(active_course=self.relations[1]).priority)
+
+    def test_allocation_command(self):
+        for student in self.students:
+            self.submit(student, self.relations[0])
+            self.submit(student, self.relations[1])
+        call_command('allocate_containers', container=[self.container.id], stdout=StringIO())
+        statuses = dict(CourseRequest.objects.values_list('student_id', 'active_course_id').filter(
+            status=ACCEPTED))
+        self.assertEqual({self.students[1].id: self.relations[0].id, self.students[0].id: self.relations[1].id},
+                         statuses)
+        self.assertEqual(2, CourseRequest.objects.filter(status=REJECTED).count())
+        self.assertEqual([1, 1], [ContainerToCourse.objects.get(pk=relation.id).accepted_count
+                                  for relation in self.relations])
+
+    def test_request_created_during_allocation_keeps_waiting(self):
+        self.submit(self.students[0], self.relations[0])
+        late_student = mommy.make(User)
+        late_student.groups.add(Group.objects.get(name='Students'))
+
+        def solve_while_student_submits(payload):
+            self.submit(late_student, self.relations[1])
+            return solve_container(payload)
+
+        with mock.patch.object(allocation, 'solve_container', side_effect=solve_while_student_submits):
+            call_command('allocate_containers', container=[self.container.id], stdout=StringIO())
+        self.assertEqual(ACCEPTED, CourseRequest.objects.get(student=self.students[0]).status)
+        self.assertEqual(SUBMITTED, CourseRequest.objects.get(student=late_student).status)
+
+    def test_waitlist_is_kept_until_allocation(self):
+        professor = mommy.make(User)
+        professor.groups.add(Group.objects.get(name='Professors'))
+        mommy.make(CourseHead, course=self.relations[0], curator=professor)
+        for student in self.students:
+            self.submit(student, self.relations[0])
+            self.submit(student, self.relations[1])
+        self.client.force_login(professor)
+        response = self.client.patch(reverse('containertocourse-detail', kwargs=dict(pk=self.relations[0].id)),
+                                     data=dict(quantity=2), format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        rejected = CourseRequest.objects.get(student=self.students[1], active_course=self.relations[0])
+        response = self.client.post(reverse('courserequest-bulk-decide'),
+                                    data=[dict(id=rejected.id, decision='reject')], format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertFalse(CourseRequest.objects.filter(status=ACCEPTED).exists())
+        self.assertEqual(0, ContainerToCourse.objects.get(pk=self.relations[0].id).accepted_count)
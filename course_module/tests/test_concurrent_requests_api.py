@@ -0,0 +1,75 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase, APIClient
+
+from course_module.models import ContainerToCourse, CourseRequest
+from eITIS.enums import ACCEPTED
+from user_module.models import User
+
+
+class ConcurrentRequestsAPITestCase(APITransactionTestCase):
+    # groups and permissions are created by migrations, keep them after flush
+    serialized_rollback = True
+
+    students_count = 40
+    threads_count = 8
+    quantity = 10
+    # submissions per second, far below the usual rate even of slow machines
+    min_throughput = 5
+
+    def setUp(self):
+        self.relation = mommy.make(ContainerToCourse, instant_accept=True, quantity=self.quantity)
+        students_group = Group.objects.get(name='Students')
+        scores = list(range(self.students_count))
+        random.shuffle(scores)
+        self.students = []
+        for score in scores:
+            student = mommy.make(User)
+            student.groups.add(students_group)
+            student.student_profile.score = score
+            student.student_profile.save()
+            self.students.append(student)
+        self.url = reverse('courserequest-list')
+
+    def submit(self, student, relation=None):
+        client = APIClient()
+        client.force_authenticate(student)
+        try:
+            return client.post(self.url, data=dict(active_course_id=(relation or self.relation).id)).status_code
+        finally:
+            connection.close()
+
+    def test_capacity_is_never_exceeded(self):
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.threads_count) as executor:
+            status_codes = list(executor.map(self.submit, self.students))
+        throughput = len(status_codes) / (time.perf_counter() - started_at)
+        report = '{} submissions in {} threads, {:.1f} requests/s'.format(
+            len(status_codes), self.threads_count, throughput)
+        self.assertEqual([status.HTTP_201_CREATED] * self.students_count, status_codes, report)
+        # lock waits and retries of submissions mustn't turn into a stall of the whole rush
+        self.assertGreater(throughput, self.min_throughput, report)
+        accepted = CourseRequest.objects.filter(active_course=self.relation, status=ACCEPTED)
+        self.assertEqual(self.quantity, accepted.count())
+        # the seats are taken by students with the highest scores, whatever the order of submissions was
+        self.assertEqual(set(range(self.students_count - self.quantity, self.students_count)),
+                         set(accepted.values_list('student__student_profile__score', flat=True)))
+        self.relation.refresh_from_db()
+        self.assertEqual((self.quantity, self.students_count),
+                         (self.relation.accepted_count, self.relation.active_count))
+
+    def test_one_course_of_container(self):
+        # requests of one student to different courses of a container are checked under the lock
+        relations = [self.relation] + [mommy.make(ContainerToCourse, container=self.relation.container)
+                                       for i in range(self.threads_count - 1)]
+        with ThreadPoolExecutor(max_workers=self.threads_count) as executor:
+            status_codes = list(executor.map(self.submit, [self.students[0]] * len(relations), relations))
+        self.assertEqual([status.HTTP_201_CREATED], [code for code in status_codes if code != status.HTTP_400_BAD_REQUEST])
+        self.assertEqual(1, CourseRequest.objects.filter(student=self.students[0]).count())
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import Group
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.models import CourseContainer, ContainerToCourse, CourseHead, CourseRequest
+from eITIS.enums import ACCEPTED
+from user_module.models import User
+
+
+class ConditionalGetAPITestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.students = []
+        for i in range(2):
+            student = mommy.make(User)
+            student.groups.add(Group.objects.get(name='Students'))
+            self.students.append(student)
+        self.professor = mommy.make(User)
+        self.professor.groups.add(Group.objects.get(name='Professors'))
+        self.containers = mommy.make(CourseContainer, _quantity=2)
+        self.relations = [mommy.make(ContainerToCourse, container=container) for container in self.containers]
+        mommy.make(CourseHead, course=self.relations[0], curator=self.professor)
+        self.request = mommy.make(CourseRequest, student=self.students[0], active_course=self.relations[0])
+        self.cards_url = reverse('containertocourse-list')
+
+    def poll(self, user, url, etag=None, **data):
+        self.client.force_authenticate(user)
+        if etag is None:
+            return self.client.get(url, data=data)
+        return self.client.get(url, data=data, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_cards_are_not_modified(self):
+        response = self.poll(self.students[0], self.cards_url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        with self.assertNumQueries(0):
+            response = self.poll(self.students[0], self.cards_url, response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertFalse(response.content)
+
+    def test_request_changes_cards_of_its_container_only(self):
+        etags = [self.poll(self.students[1], self.cards_url, container=container.id)['ETag']
+                 for container in self.containers]
+        self.client.force_authenticate(self.students[1])
+        self.client.post(reverse('courserequest-list'), data=dict(active_course_id=self.relations[1].id))
+        self.assertEqual(
+            [status.HTTP_304_NOT_MODIFIED, status.HTTP_200_OK],
+            [self.poll(self.students[1], self.cards_url, etag, container=container.id).status_code
+             for etag, container in zip(etags, self.containers)])
+
+    def test_card_detail(self):
+        url = '/course_api/cards/{}/'.format(self.relations[0].id)
+        etag = self.poll(self.students[0], url)['ETag']
+        # weak validator of the same response matches too
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, self.poll(self.students[0], url, 'W/' + etag).status_code)
+        self.relations[0].quantity = 5
+        self.relations[0].save()
+        response = self.poll(self.students[0], url, etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(5, response.data['quantity'])
+
+    def test_containers(self):
+        url = reverse('coursecontainer-list')
+        etag = self.poll(self.students[0], url)['ETag']
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, self.poll(self.students[0], url, etag).status_code)
+        detail_url = reverse('coursecontainer-detail', kwargs=dict(pk=self.containers[0].id))
+        etag = self.poll(self.students[0], detail_url)['ETag']
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, self.poll(self.students[0], detail_url, etag).status_code)
+
+    def test_requests_follow_decisions(self):
+        url = reverse('courserequest-list')
+        detail_url = reverse('courserequest-detail', kwargs=dict(pk=self.request.id))
+        etag = self.poll(self.students[0], url)['ETag']
+        detail_etag = self.poll(self.students[0], detail_url)['ETag']
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, self.poll(self.students[0], url, etag).status_code)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED,
+                         self.poll(self.students[0], detail_url, detail_etag).status_code)
+
+        self.client.force_authenticate(self.professor)
+        self.client.post(reverse('courserequest-accept-request'), data=dict(id=self.request.id))
+        response = self.poll(self.students[0], url, etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(ACCEPTED, response.data['results'][0]['status'])
+        self.assertEqual(status.HTTP_200_OK, self.poll(self.students[0], detail_url, detail_etag).status_code)
+
+    def test_etag_differs_between_users(self):
+        url = reverse('courserequest-list')
+        mommy.make(CourseRequest, student=self.students[1], active_course=self.relations[0])
+        etag = self.poll(self.students[0], url)['ETag']
+        self.assertEqual(status.HTTP_200_OK, self.poll(self.students[1], url, etag).status_code)
+        self.assertEqual(status.HTTP_200_OK, self.poll(self.professor, url, etag).status_code)
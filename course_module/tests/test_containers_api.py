@@ -4,7 +4,8 @@ from model_mommy import mommy
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from course_module.models import ContainerToCourse, CourseHead
+from course_module.models import ContainerToCourse, CourseHead, CourseRequest
+from eITIS.enums import ACCEPTED, SUBMITTED
 from user_module.models import User
 
 
@@ -42,3 +43,43 @@ class ContainerToCourseAPITestCase(APITestCase):
         response = self.client.patch(url, data=dict(quantity=9))
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
         self.assertTrue('quantity' in response.data)
+
+    def make_requests(self, relation, scores, status):
+        return [mommy.make(CourseRequest, active_course=relation, score=score, status=status) for score in scores]
+
+    def get_accepted_scores(self, relation):
+        return set(CourseRequest.objects.filter(active_course=relation, status=ACCEPTED).values_list('score', flat=True))
+
+    def test_raising_quantity_accepts_best_of_waitlist(self):
+        relation = self.allowed_container_to_course2
+        relation.instant_accept = True
+        relation.save()
+        self.make_requests(relation, range(20), ACCEPTED)
+        self.make_requests(relation, range(20, 40), SUBMITTED)
+        self.client.force_login(self.prof)
+        url = reverse('containertocourse-detail', kwargs=dict(pk=relation.id))
+        response = self.client.patch(url, data=dict(quantity=25))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(set(range(20)) | set(range(35, 40)), self.get_accepted_scores(relation))
+        self.assertEqual(25, response.data['accepted_count'])
+
+    def test_cutting_quantity_returns_worst_to_waitlist(self):
+        relation = self.allowed_container_to_course2
+        relation.instant_accept = True
+        relation.save()
+        self.make_requests(relation, range(20), ACCEPTED)
+        self.client.force_login(self.prof)
+        url = reverse('containertocourse-detail', kwargs=dict(pk=relation.id))
+        response = self.client.patch(url, data=dict(quantity=15))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(set(range(5, 20)), self.get_accepted_scores(relation))
+        self.assertEqual(15, response.data['accepted_count'])
+
+    def test_enabling_instant_accept_fills_free_seats(self):
+        relation = self.allowed_container_to_course2
+        self.make_requests(relation, range(30), SUBMITTED)
+        self.client.force_login(self.prof)
+        url = reverse('containertocourse-detail', kwargs=dict(pk=relation.id))
+        response = self.client.patch(url, data=dict(instant_accept=True))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(set(range(10, 30)), self.get_accepted_scores(relation))
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache, get_stats
+from course_module.checks import check_course_cache
+from course_module.models import CourseContainer, ContainerToCourse, CourseHead
+from user_module.models import User
+
+
+class CourseCacheAPITestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.student = mommy.make(User)
+        self.student.groups.add(Group.objects.get(name='Students'))
+        self.professors = [mommy.make(User) for i in range(2)]
+        for professor in self.professors:
+            professor.groups.add(Group.objects.get(name='Professors'))
+        self.container = mommy.make(CourseContainer)
+        self.relations = mommy.make(ContainerToCourse, container=self.container, instant_accept=True, _quantity=2)
+        mommy.make(CourseHead, course=self.relations[0], curator=self.professors[0])
+        self.cards_url = reverse('containertocourse-list')
+        self.containers_url = reverse('coursecontainer-list')
+
+    def get(self, user, url, **data):
+        self.client.force_login(user)
+        response = self.client.get(url, data=data)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response
+
+    def test_second_request_is_cached(self):
+        first = self.get(self.student, self.cards_url)
+        second = self.get(self.student, self.cards_url)
+        self.assertEqual(('MISS', 'HIT'), (first['X-Cache'], second['X-Cache']))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual('MISS', self.get(self.student, self.cards_url, container=self.container.id)['X-Cache'])
+        self.assertEqual(dict(hits=1, misses=2), {stat: get_stats()[stat] for stat in ('hits', 'misses')})
+
+    def test_request_invalidates_cards_only(self):
+        self.get(self.student, self.cards_url)
+        self.get(self.student, self.containers_url)
+        self.client.force_login(self.student)
+        self.client.post(reverse('courserequest-list'), data=dict(active_course_id=self.relations[0].id))
+        response = self.get(self.student, self.cards_url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual(1, response.data['results'][0]['accepted_requests'])
+        self.assertEqual('HIT', self.get(self.student, self.containers_url)['X-Cache'])
+
+    def test_container_change_invalidates_containers(self):
+        self.get(self.student, self.containers_url)
+        self.container.name = 'Новое название'
+        self.container.save()
+        response = self.get(self.student, self.containers_url)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('Новое название', response.data['results'][0]['name'])
+
+    def test_my_cards_are_cached_per_professor(self):
+        self.assertEqual(1, self.get(self.professors[0], self.cards_url, my=True).data['count'])
+        response = self.get(self.professors[1], self.cards_url, my=True)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual(0, response.data['count'])
+
+    def test_quantity_update_invalidates_cards(self):
+        url = reverse('containertocourse-detail', kwargs=dict(pk=self.relations[0].id))
+        self.get(self.student, '/course_api/cards/{}/'.format(self.relations[0].id))
+        self.client.force_login(self.professors[0])
+        self.client.patch(url, data=dict(quantity=20))
+        response = self.get(self.student, '/course_api/cards/{}/'.format(self.relations[0].id))
+        self.assertEqual(('MISS', 20), (response['X-Cache'], response.data['quantity']))
+
+    def test_stats_command(self):
+        self.get(self.student, self.cards_url)
+        self.get(self.student, self.cards_url)
+        stdout = StringIO()
+        call_command('course_cache_stats', reset=True, stdout=stdout)
+        self.assertTrue('hits: 1, misses: 1' in stdout.getvalue())
+        self.assertEqual(0, get_stats()['hits'])
+
+    @override_settings(COURSE_CACHE_ALIAS=None)
+    def test_cache_can_be_disabled(self):
+        response = self.get(self.student, self.cards_url)
+        self.assertFalse(response.has_header('X-Cache'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(0, get_stats()['misses'])
+
+    def test_deploy_check_requires_shared_cache(self):
+        self.assertEqual(['course_module.E002'], [error.id for error in check_course_cache(None)])
+        with override_settings(COURSE_CACHE_ALIAS='course', CACHES=dict(course=dict(
+                BACKEND='django.core.cache.backends.memcached.MemcachedCache', LOCATION='127.0.0.1:11211'))):
+            self.assertEqual([], check_course_cache(None))
+        with override_settings(COURSE_CACHE_ALIAS=None):
+            self.assertEqual([], check_course_cache(None))
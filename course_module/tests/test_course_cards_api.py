@@ -1,9 +1,14 @@
+from datetime import date
+
 from django.contrib.auth.models import Group
 from django.urls import reverse
 from model_mommy import mommy
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from course_module.models import Course
+from study_group_module.models import StudyGroup, get_academic_year
+
 
 class CourseCardForStudentAPITestCase(APITestCase):
     def setUp(self):
@@ -53,6 +58,17 @@ class CourseCardForStudentAPITestCase(APITestCase):
         for i in range(2):
             self.assertEqual(self.courses[i + 2].id, response.data['results'][i]['course']['id'])
 
+    def test_filter_by_course(self):
+        # group of the user and another group of the second container are on the third year
+        StudyGroup.objects.filter(group_relations__container__in=self.containers[:2]).update(
+            start_year=date(get_academic_year() - 2, 9, 1))
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, data=dict(course=3))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(self.courses[:4], [Course.objects.get(pk=card['course']['id'])
+                                            for card in response.data['results']])
+        self.assertEqual(0, self.client.get(self.url, data=dict(course=1)).data['count'])
+
     def test_detail(self):
         url = '/course_api/cards/{}/'.format(self.containers[0].container_course_relations.first().id)
         self.client.force_login(self.user)
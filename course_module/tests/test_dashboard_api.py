@@ -0,0 +1,67 @@
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.models import CourseContainer, ContainerToCourse, CourseHead, CourseRequest
+from eITIS.enums import SUBMITTED, ACCEPTED, REJECTED
+from eITIS.tests.helpers import make_user
+
+
+class DashboardAPITestCase(APITestCase):
+    url = '/course_api/cards/dashboard/'
+
+    def setUp(self):
+        self.professor = make_user('Professors')
+        self.relations = [mommy.make(ContainerToCourse, container=mommy.make(CourseContainer)) for i in range(2)]
+        for relation in self.relations:
+            mommy.make(CourseHead, course=relation, curator=self.professor)
+        self.other_relation = mommy.make(ContainerToCourse, container=mommy.make(CourseContainer))
+        mommy.make(CourseHead, course=self.other_relation, curator=make_user('Professors'))
+        self.scores = [50, 90, 70, 80, 60, 95, 85]
+        self.requests = [self.make_request(self.relations[0], score) for score in self.scores]
+        self.make_request(self.relations[0], 100, ACCEPTED)
+        self.make_request(self.relations[0], 99, REJECTED)
+        self.make_request(self.other_relation, 100)
+
+    def make_request(self, relation, score, request_status=SUBMITTED):
+        return mommy.make(CourseRequest, student=make_user('Students'), active_course=relation, score=score,
+                          status=request_status)
+
+    def get(self, user, **data):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url, data=data)
+
+    def test_courses_with_counts_and_best_pending_requests(self):
+        response = self.get(self.professor)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([relation.id for relation in self.relations], [card['id'] for card in response.data])
+        card, empty_card = response.data
+        self.assertEqual((7, 1, 1, 100),
+                         tuple(card['statistics'][name] for name in ('submitted_count', 'accepted_count',
+                                                                     'rejected_count', 'average_score')))
+        by_score = sorted(self.requests, key=lambda request: -request.score)
+        self.assertEqual([request.id for request in by_score[:5]], [request['id'] for request in card['pending']])
+        self.assertEqual([], empty_card['pending'])
+        self.assertEqual(0, empty_card['statistics']['submitted_count'])
+
+        response = self.get(self.professor, pending=2)
+        self.assertEqual([request.id for request in by_score[:2]],
+                         [request['id'] for request in response.data[0]['pending']])
+
+    def test_constant_number_of_queries(self):
+        self.client.force_authenticate(self.professor)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        for relation in self.relations:
+            for score in self.scores:
+                self.make_request(relation, score)
+        self.relations.append(mommy.make(ContainerToCourse, container=mommy.make(CourseContainer)))
+        mommy.make(CourseHead, course=self.relations[-1], curator=self.professor)
+        with self.assertNumQueries(3):
+            response = self.get(self.professor, pending=50)
+        self.assertEqual([2 * len(self.scores), len(self.scores), 0],
+                         [len(card['pending']) for card in response.data])
+
+    def test_only_for_professors(self):
+        student = self.requests[0].student
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.get(student).status_code)
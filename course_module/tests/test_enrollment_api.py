@@ -0,0 +1,69 @@
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.models import CourseContainer, ContainerToCourse, ContainerToGroup, CourseHead, CourseRequest
+from eITIS.enums import CLOSED
+from eITIS.tests.helpers import make_user
+from study_group_module.models import StudyGroup
+
+
+class EnrollmentAPITestCase(APITestCase):
+    url = '/course_api/enrollment/'
+
+    def setUp(self):
+        self.group = mommy.make(StudyGroup)
+        self.student = make_user('Students')
+        self.student.student_profile.group = self.group
+        self.student.student_profile.save()
+        self.containers = [self.make_container(self.group) for i in range(2)]
+        self.closed_container = self.make_container(self.group, status=CLOSED)
+        self.other_container = self.make_container(mommy.make(StudyGroup))
+        self.cards = [self.make_card(container) for container in self.containers for i in range(2)]
+        self.requests = [mommy.make(CourseRequest, student=self.student, active_course=card)
+                         for card in (self.cards[0], self.cards[2], self.make_card(self.closed_container))]
+
+    @staticmethod
+    def make_container(group, **kwargs):
+        container = mommy.make(CourseContainer, **kwargs)
+        mommy.make(ContainerToGroup, container=container, group=group)
+        return container
+
+    def make_card(self, container):
+        card = mommy.make(ContainerToCourse, container=container)
+        mommy.make(CourseHead, course=card, curator=make_user('Professors'))
+        return card
+
+    def get(self, user):
+        self.client.force_authenticate(user)
+        return self.client.get(self.url)
+
+    def test_open_containers_with_cards_and_requests(self):
+        response = self.get(self.student)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(self.group.id, response.data['user']['student_profile']['group']['id'])
+        self.assertEqual([container.id for container in self.containers],
+                         [container['id'] for container in response.data['containers']])
+        self.assertEqual([[card.id for card in self.cards[:2]], [card.id for card in self.cards[2:]]],
+                         [[card['id'] for card in container['cards']] for container in response.data['containers']])
+        card = response.data['containers'][0]['cards'][0]
+        self.assertEqual(self.cards[0].course_id, card['course']['id'])
+        self.assertEqual(1, len(card['heads']))
+        self.assertEqual([(request.id, request.active_course_id) for request in self.requests],
+                         [(request['id'], request['active_course']) for request in response.data['requests']])
+
+    def test_constant_number_of_queries(self):
+        self.client.force_authenticate(self.student)
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+        self.containers.append(self.make_container(self.group))
+        for container in self.containers:
+            card = self.make_card(container)
+            mommy.make(CourseRequest, student=self.student, active_course=card)
+        with self.assertNumQueries(5):
+            response = self.get(self.student)
+        self.assertEqual([3, 3, 1], [len(container['cards']) for container in response.data['containers']])
+        self.assertEqual(6, len(response.data['requests']))
+
+    def test_only_for_students(self):
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.get(make_user('Professors')).status_code)
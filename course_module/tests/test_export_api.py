@@ -0,0 +1,80 @@
+import csv
+import gzip
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from django.contrib.auth.models import Permission
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.models import CourseContainer, ContainerToCourse, CourseRequest, Course
+from eITIS.enums import ACCEPTED, SUBMITTED
+from eITIS.tests.helpers import make_user
+from study_group_module.models import StudyGroup
+
+
+class ExportAPITestCase(APITestCase):
+    def setUp(self):
+        self.deanery = make_user('Deanery_Workers')
+        self.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+        self.container = mommy.make(CourseContainer, created_by=self.deanery)
+        self.relations = [mommy.make(ContainerToCourse, container=self.container,
+                                     course=mommy.make(Course, name=name)) for name in ('Б-курс', 'А-курс')]
+        self.group = mommy.make(StudyGroup, group_number='11-801')
+        self.make_request(self.relations[0], 'Иванов', 70)
+        self.make_request(self.relations[0], 'Петров', 90)
+        self.make_request(self.relations[1], 'Сидоров', 80)
+        self.make_request(self.relations[1], 'Смирнов', 100, SUBMITTED)
+        self.make_request(mommy.make(ContainerToCourse), 'Кузнецов', 100)
+        self.client.force_authenticate(self.deanery)
+
+    def make_request(self, relation, last_name, score, request_status=ACCEPTED):
+        student = make_user('Students', last_name=last_name, first_name='Иван', middle_name='',
+                            email='{}@kpfu.ru'.format(score))
+        student.student_profile.group = self.group
+        student.student_profile.save()
+        return mommy.make(CourseRequest, student=student, active_course=relation, score=score,
+                          status=request_status)
+
+    def url(self, file_type):
+        return '/course_api/containers/{}/export/{}/'.format(self.container.id, file_type)
+
+    def test_csv(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url('csv'))
+            content = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(['Курс', 'Фамилия', 'Имя', 'Отчество', 'Email', 'Группа', 'Балл'], rows[0])
+        self.assertEqual([['А-курс', 'Сидоров', 'Иван', '', '80@kpfu.ru', '11-801', '80.0'],
+                          ['Б-курс', 'Петров', 'Иван', '', '90@kpfu.ru', '11-801', '90.0'],
+                          ['Б-курс', 'Иванов', 'Иван', '', '70@kpfu.ru', '11-801', '70.0']], rows[1:])
+
+        response = self.client.get(self.url('csv'), data=dict(course=self.relations[1].id))
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual(['Сидоров'], [row[1] for row in rows[1:]])
+
+    def test_gzip(self):
+        response = self.client.get(self.url('csv'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual('gzip', response['Content-Encoding'])
+        content = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8-sig')
+        self.assertEqual(4, len(content.splitlines()))
+
+    def test_xlsx(self):
+        response = self.client.get(self.url('xlsx'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn('xl/workbook.xml', archive.namelist())
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        rows = [[cell.findtext('{0}is/{0}t'.format(namespace)) or cell.findtext(namespace + 'v')
+                 for cell in row] for row in sheet.iter(namespace + 'row')]
+        self.assertEqual(4, len(rows))
+        self.assertEqual(['А-курс', 'Сидоров', 'Иван', None, '80@kpfu.ru', '11-801', '80.0'], rows[1])
+
+    def test_only_for_deanery(self):
+        self.client.force_authenticate(make_user('Professors'))
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(self.url('csv')).status_code)
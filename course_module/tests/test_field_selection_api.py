@@ -0,0 +1,68 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.models import CourseContainer, ContainerToCourse, CourseHead, CourseRequest
+from user_module.models import User
+
+
+class FieldSelectionAPITestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.student = mommy.make(User)
+        self.student.groups.add(Group.objects.get(name='Students'))
+        self.professor = mommy.make(User)
+        self.professor.groups.add(Group.objects.get(name='Professors'))
+        self.relations = mommy.make(ContainerToCourse, container=mommy.make(CourseContainer), _quantity=3)
+        for relation in self.relations:
+            mommy.make(CourseHead, course=relation, curator=self.professor)
+            mommy.make(CourseRequest, student=self.student, active_course=relation)
+        self.client.force_authenticate(self.student)
+
+    def get(self, url, **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, data=data)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response, [query['sql'] for query in queries]
+
+    def test_fields_of_requests(self):
+        response, queries = self.get(reverse('courserequest-list'), fields='id,status')
+        full_response, full_queries = self.get(reverse('courserequest-list'))
+        self.assertEqual({'id', 'status'}, set(response.data['results'][0]))
+        self.assertLess(len(queries), len(full_queries))
+
+    def test_fields_of_nested_relation(self):
+        response, queries = self.get(reverse('courserequest-list'), fields='id,active_course.course.name')
+        self.assertEqual({'course': {'name': self.relations[0].course.name}},
+                         response.data['results'][0]['active_course'])
+        self.assertFalse([query for query in queries if 'coursehead' in query])
+
+    def test_not_expanded_relations_are_ids(self):
+        response, queries = self.get(reverse('courserequest-list'), expand='')
+        self.assertEqual((self.relations[0].id, self.student.id),
+                         (response.data['results'][0]['active_course'], response.data['results'][0]['student']))
+        response, queries = self.get(reverse('courserequest-list'), expand='active_course')
+        active_course = response.data['results'][0]['active_course']
+        self.assertEqual((self.relations[0].course_id, [self.professor.id]),
+                         (active_course['course'], active_course['heads']))
+
+    def test_cards(self):
+        response, queries = self.get(reverse('containertocourse-list'), expand='course',
+                                     fields='id,course,container')
+        card = response.data['results'][0]
+        self.assertEqual({'id', 'course', 'container'}, set(card))
+        self.assertEqual(self.relations[0].course.name, card['course']['name'])
+        self.assertEqual(self.relations[0].container_id, card['container'])
+        self.assertFalse([query for query in queries if 'coursehead' in query])
+
+    def test_create_ignores_fields(self):
+        relation = mommy.make(ContainerToCourse)
+        response = self.client.post('{}?fields=id'.format(reverse('courserequest-list')),
+                                    data=dict(active_course_id=relation.id))
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertTrue(CourseRequest.objects.filter(student=self.student, active_course=relation).exists())
@@ -0,0 +1,57 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.models import CourseContainer, ContainerToCourse, CourseRequest
+from user_module.models import User
+
+
+class KeysetPaginationAPITestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.deanery = mommy.make(User)
+        self.deanery.groups.add(Group.objects.get(name='Deanery_Workers'))
+        self.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+        self.relations = mommy.make(ContainerToCourse, container=mommy.make(CourseContainer), _quantity=5)
+        self.requests = [mommy.make(CourseRequest, student=mommy.make(User), active_course=self.relations[i % 5])
+                         for i in range(12)]
+        self.client.force_authenticate(self.deanery)
+
+    def walk(self, url, **data):
+        ids, pages = [], []
+        response = self.client.get(url, data=data)
+        while True:
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            pages.append(response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_requests_are_walked_by_cursor(self):
+        ids, pages = self.walk(reverse('courserequest-list'), limit=5)
+        self.assertEqual(sorted(request.id for request in self.requests), ids)
+        self.assertEqual([12, None, None], [page['count'] for page in pages])
+
+    def test_cards_are_walked_by_cursor(self):
+        ids, pages = self.walk(reverse('containertocourse-list'), limit=2, container=self.relations[0].container_id)
+        self.assertEqual(sorted(relation.id for relation in self.relations), ids)
+        self.assertEqual(5, pages[0]['count'])
+
+    def test_count_is_optional(self):
+        response = self.client.get(reverse('courserequest-list'), data=dict(limit=5, count='false'))
+        self.assertIsNone(response.data['count'])
+        self.assertEqual(5, len(response.data['results']))
+
+    def test_next_page_does_not_count(self):
+        next_url = self.client.get(reverse('courserequest-list'), data=dict(limit=5)).data['next']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(next_url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+        self.assertEqual(self.requests[5].id, response.data['results'][0]['id'])
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import Group
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.models import CourseContainer, ContainerToCourse
+from eITIS.enums import SUBMITTED, ACCEPTED
+from user_module.models import User
+
+
+class PositionAPITestCase(APITestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.relation = mommy.make(ContainerToCourse, container=mommy.make(CourseContainer), instant_accept=True,
+                                   quantity=2, min_quantity=1)
+        self.url = '/course_api/cards/{}/position/'.format(self.relation.id)
+        self.students = [self.make_student(score) for score in (70, 90, 80)]
+
+    def make_student(self, score):
+        student = mommy.make(User)
+        student.groups.add(Group.objects.get(name='Students'))
+        student.student_profile.score = score
+        student.student_profile.save()
+        self.client.force_authenticate(student)
+        self.client.post('/course_api/requests/', data=dict(active_course_id=self.relation.id))
+        return student
+
+    def get(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return response
+
+    def test_position_and_cutoff(self):
+        self.assertEqual([(SUBMITTED, 3), (ACCEPTED, 1), (ACCEPTED, 2)],
+                         [(self.get(student).data['request_status'], self.get(student).data['position'])
+                          for student in self.students])
+        data = self.get(self.students[0]).data
+        self.assertEqual((80, 2, 3), (data['cutoff_score'], data['accepted_requests'], data['all_requests']))
+
+    def test_cached_until_requests_change(self):
+        self.assertEqual('MISS', self.get(self.students[0])['X-Cache'])
+        with self.assertNumQueries(1):
+            self.assertEqual('HIT', self.get(self.students[0])['X-Cache'])
+        # another student's response is not shared
+        self.assertEqual(1, self.get(self.students[1]).data['position'])
+
+        self.make_student(100)
+        response = self.get(self.students[0])
+        self.assertEqual(('MISS', 4), (response['X-Cache'], response.data['position']))
+        self.assertEqual(90, response.data['cutoff_score'])
+
+        profile = self.students[0].student_profile
+        profile.score = 95
+        profile.save()
+        self.assertEqual(2, self.get(self.students[0]).data['position'])
+
+    def test_without_request(self):
+        professor = mommy.make(User)
+        professor.groups.add(Group.objects.get(name='Professors'))
+        data = self.get(professor).data
+        self.assertEqual((None, None, 80), (data['request_status'], data['position'], data['cutoff_score']))
+        self.client.force_authenticate(professor)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get('/course_api/cards/0/position/').status_code)
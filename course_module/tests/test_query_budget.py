@@ -0,0 +1,151 @@
+from django.contrib.auth.models import Permission
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.models import CourseContainer, ContainerToCourse, ContainerToGroup, CourseHead, CourseRequest, \
+    RequestTicket
+from eITIS.enums import ACCEPTED
+from eITIS.tests.helpers import make_user, QueryBudgetMixin
+from study_group_module.models import StudyGroup
+
+
+# query budgets of endpoints are checked on fixtures with many rows,
+# so a budget which doesn't hold means that queries grow with the number of returned rows
+class QueryBudgetAPITestCase(QueryBudgetMixin, APITestCase):
+    cards_count = 30
+    students_count = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.deanery = make_user('Deanery_Workers')
+        cls.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+        cls.professor = make_user('Professors')
+        cls.group = mommy.make(StudyGroup)
+        cls.container = mommy.make(CourseContainer, created_by=cls.deanery)
+        mommy.make(ContainerToGroup, container=cls.container, group=cls.group)
+
+        cls.cards = []
+        for index in range(cls.cards_count):
+            card = mommy.make(ContainerToCourse, container=cls.container, instant_accept=index % 2 == 0,
+                              quantity=cls.students_count)
+            mommy.make(CourseHead, course=card, curator=cls.professor)
+            mommy.make(CourseHead, course=card, curator=make_user('Professors'))
+            cls.cards.append(card)
+
+        cls.students = [make_user('Students') for i in range(cls.students_count)]
+        cls.requests = []
+        for index, student in enumerate(cls.students):
+            student.student_profile.group = cls.group
+            student.student_profile.save()
+            cls.requests.append(mommy.make(CourseRequest, student=student,
+                                           active_course=cls.cards[index % cls.cards_count]))
+        cls.student = cls.students[0]
+        # requests of the student in other containers, so his list has many rows too
+        for index in range(cls.cards_count):
+            mommy.make(CourseRequest, student=cls.student, active_course=mommy.make(ContainerToCourse))
+        mommy.make(RequestTicket, student=cls.student, active_course=cls.cards[0], _quantity=cls.cards_count)
+
+    # CARDS
+
+    def test_cards_list(self):
+        for user in (self.student, self.professor, self.deanery):
+            response = self.assertQueryBudget(3, user, 'get', reverse('containertocourse-list'))
+            self.assertTrue(response.data['count'] > self.cards_count)
+
+    def test_my_cards_list(self):
+        for user in (self.student, self.professor):
+            response = self.assertQueryBudget(3, user, 'get', reverse('containertocourse-list'), dict(my=True))
+            self.assertEqual(self.cards_count, response.data['count'])
+
+    def test_card_detail(self):
+        url = '/course_api/cards/{}/'.format(self.cards[0].id)
+        for user in (self.student, self.professor, self.deanery):
+            self.assertQueryBudget(5, user, 'get', url)
+
+    def test_dashboard(self):
+        response = self.assertQueryBudget(3, self.professor, 'get', reverse('containertocourse-dashboard'))
+        self.assertEqual(self.cards_count, len(response.data))
+
+    # CONTAINERS
+
+    def test_containers_list(self):
+        mommy.make(CourseContainer, created_by=self.deanery, _quantity=self.cards_count)
+        for user in (self.student, self.professor, self.deanery):
+            self.assertQueryBudget(2, user, 'get', reverse('coursecontainer-list'))
+
+    def test_container_detail(self):
+        url = reverse('coursecontainer-detail', kwargs=dict(pk=self.container.id))
+        for user in (self.student, self.professor, self.deanery):
+            self.assertQueryBudget(1, user, 'get', url)
+
+    # REQUESTS
+
+    def test_requests_list_of_student(self):
+        response = self.assertQueryBudget(4, self.student, 'get', reverse('courserequest-list'))
+        self.assertTrue(response.data['count'] > self.cards_count)
+
+    def test_requests_list_of_professor(self):
+        response = self.assertQueryBudget(3, self.professor, 'get', reverse('courserequest-list'))
+        self.assertTrue(response.data['count'] > self.cards_count)
+
+    def test_requests_list_of_deanery(self):
+        response = self.assertQueryBudget(2, self.deanery, 'get', reverse('courserequest-list'))
+        self.assertTrue(response.data['count'] > self.students_count)
+
+    def test_request_detail(self):
+        url = reverse('courserequest-detail', kwargs=dict(pk=self.requests[0].id))
+        self.assertQueryBudget(3, self.student, 'get', url)
+        self.assertQueryBudget(2, self.professor, 'get', url)
+
+    def test_create_request(self):
+        CourseRequest.objects.filter(student=self.students[1]).delete()
+        self.assertQueryBudget(14, self.students[1], 'post', reverse('courserequest-list'),
+                               dict(active_course_id=self.cards[0].id), status_code=status.HTTP_201_CREATED)
+
+    def test_delete_request(self):
+        url = reverse('courserequest-detail', kwargs=dict(pk=self.requests[0].id))
+        self.assertQueryBudget(9, self.student, 'delete', url, status_code=status.HTTP_204_NO_CONTENT)
+
+    def test_accept_and_reject_request(self):
+        self.assertQueryBudget(14, self.professor, 'post', reverse('courserequest-accept-request'),
+                               dict(id=self.requests[1].id))
+        self.assertQueryBudget(14, self.professor, 'post', reverse('courserequest-reject-request'),
+                               dict(id=self.requests[1].id))
+
+    def test_bulk_decide(self):
+        decisions = [dict(id=request.id, decision='accept') for request in self.requests]
+        response = self.assertQueryBudget(9, self.professor, 'post', reverse('courserequest-bulk-decide'),
+                                          decisions)
+        self.assertEqual([ACCEPTED] * self.students_count, [result['status'] for result in response.data])
+
+    def test_bulk_decide_promotes_waitlists(self):
+        # every instant-accept card is full and frees its seat for the head of its waitlist
+        instant_cards = [card.id for card in self.cards[::2]]
+        ContainerToCourse.objects.filter(pk__in=instant_cards).update(quantity=1)
+        accepted = self.requests[:self.cards_count:2]
+        waiting = self.requests[self.cards_count::2]
+        CourseRequest.objects.filter(pk__in=[request.id for request in accepted]).update(status=ACCEPTED)
+        ContainerToCourse.objects.filter(pk__in=instant_cards).rebuild_counters()
+        decisions = [dict(id=request.id, decision='reject') for request in accepted]
+        self.assertQueryBudget(11, self.professor, 'post', reverse('courserequest-bulk-decide'), decisions)
+        self.assertEqual(len(waiting), CourseRequest.objects.filter(
+            pk__in=[request.id for request in waiting], status=ACCEPTED).count())
+        self.assertEqual([1] * len(instant_cards), list(ContainerToCourse.objects.filter(
+            pk__in=instant_cards).values_list('accepted_count', flat=True)))
+
+    def test_enrollment(self):
+        response = self.assertQueryBudget(5, self.student, 'get', reverse('enrollment-list'))
+        self.assertEqual(self.cards_count, len(response.data['containers'][0]['cards']))
+        self.assertEqual(self.cards_count + 1, len(response.data['requests']))
+
+    # RELATIONS AND TICKETS
+
+    def test_update_relation(self):
+        url = reverse('containertocourse-detail', kwargs=dict(pk=self.cards[0].id))
+        self.assertQueryBudget(12, self.professor, 'patch', url, dict(quantity=self.students_count + 1))
+
+    def test_tickets_list(self):
+        response = self.assertQueryBudget(2, self.student, 'get', reverse('requestticket-list'))
+        self.assertEqual(self.cards_count, response.data['count'])
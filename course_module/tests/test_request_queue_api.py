@@ -0,0 +1,94 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection, DatabaseError
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.intake import get_claimable_tickets, process_ticket, claim_tickets
+from course_module.models import ContainerToCourse, CourseRequest, RequestTicket
+from eITIS.enums import ACCEPTED, SUBMITTED, CLOSED, TICKET_PENDING, TICKET_PROCESSING, TICKET_DONE, \
+    TICKET_FAILED
+from user_module.models import User
+
+
+@override_settings(COURSE_REQUESTS_INTAKE_QUEUE=True)
+class RequestQueueAPITestCase(APITestCase):
+    def setUp(self):
+        self.relation = mommy.make(ContainerToCourse, instant_accept=True, quantity=1)
+        self.students = []
+        for score in (3, 8):
+            student = mommy.make(User)
+            student.groups.add(Group.objects.get(name='Students'))
+            student.student_profile.score = score
+            student.student_profile.save()
+            self.students.append(student)
+        self.url = reverse('courserequest-list')
+
+    def enqueue(self, student, relation):
+        self.client.force_login(student)
+        return self.client.post(self.url, data=dict(active_course_id=relation.id))
+
+    def test_submission_is_queued(self):
+        response = self.enqueue(self.students[0], self.relation)
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        self.assertEqual(TICKET_PENDING, response.data['status'])
+        self.assertFalse(CourseRequest.objects.exists())
+        ticket = RequestTicket.objects.get(pk=response.data['id'])
+        self.assertEqual(self.students[0], ticket.student)
+
+    def test_worker_creates_requests_by_score(self):
+        tickets = [self.enqueue(student, self.relation).data['id'] for student in self.students]
+        call_command('process_request_queue', once=True, stdout=StringIO())
+        self.assertEqual([TICKET_DONE, TICKET_DONE],
+                         [RequestTicket.objects.get(pk=ticket_id).status for ticket_id in tickets])
+        self.assertEqual(SUBMITTED, CourseRequest.objects.get(student=self.students[0]).status)
+        self.assertEqual(ACCEPTED, CourseRequest.objects.get(student=self.students[1]).status)
+        # the student with the lower score was never accepted and then returned to waitlist
+        self.assertEqual(1, ContainerToCourse.objects.get(pk=self.relation.id).accepted_count)
+
+        self.client.force_login(self.students[1])
+        response = self.client.get(reverse('requestticket-detail', kwargs=dict(pk=tickets[1])))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(TICKET_DONE, response.data['status'])
+        self.assertEqual(ACCEPTED, response.data['request_status'])
+
+    def test_invalid_ticket_fails(self):
+        closed_relation = mommy.make(ContainerToCourse, status=CLOSED)
+        ticket_id = self.enqueue(self.students[0], closed_relation).data['id']
+        call_command('process_request_queue', once=True, stdout=StringIO())
+        self.client.force_login(self.students[0])
+        response = self.client.get(reverse('requestticket-detail', kwargs=dict(pk=ticket_id)))
+        self.assertEqual(TICKET_FAILED, response.data['status'])
+        self.assertTrue('active_course_id' in response.data['errors'])
+
+    def test_student_sees_only_own_tickets(self):
+        self.enqueue(self.students[0], self.relation)
+        self.client.force_login(self.students[1])
+        response = self.client.get(reverse('requestticket-list'))
+        self.assertEqual(0, response.data['count'])
+
+    def test_claim_locks_only_tickets(self):
+        # sql of PostgreSQL is compiled without connecting, the ordering joins profiles by outer join
+        postgresql = PostgreSQLDatabaseWrapper(dict(connection.settings_dict, NAME='eitis_db'), alias='postgresql')
+        postgresql.connection, postgresql.autocommit, postgresql.pg_version = object(), False, 100000
+        tickets = get_claimable_tickets(timezone.now(), postgresql).values_list('id', flat=True)[:10]
+        sql, params = tickets.query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('LEFT OUTER JOIN', sql)
+        self.assertTrue(sql.endswith('FOR UPDATE OF "course_module_requestticket" SKIP LOCKED'), sql)
+
+    def test_request_and_ticket_are_saved_together(self):
+        self.enqueue(self.students[0], self.relation)
+        ticket = claim_tickets(10)[0]
+        with mock.patch.object(RequestTicket, 'save', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                process_ticket(ticket)
+        self.assertFalse(CourseRequest.objects.exists())
+        self.assertEqual(TICKET_PROCESSING, RequestTicket.objects.get(pk=ticket.pk).status)
@@ -1,11 +1,20 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
 from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db import connection, IntegrityError
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from model_mommy import mommy
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from course_module.models import CourseRequest, Course, CourseContainer, ContainerToCourse, CourseHead
-from eITIS.enums import ACCEPTED, SUBMITTED, CLOSED
+from course_module.models import CourseRequest, Course, CourseContainer, ContainerToCourse, CourseHead, \
+    ContainerToGroup
+from eITIS.enums import ACCEPTED, SUBMITTED, CLOSED, REJECTED
+from study_group_module.models import StudyGroup, get_academic_year
 from user_module.models import User
 
 
@@ -70,6 +79,13 @@ class RequestsAPITestCase(APITestCase):
         response = self.client.post(url, data=dict(active_course_id=self.requests_of_student1[0].active_course.id))
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_concurrent_duplicate_is_bad_request(self):
+        self.client.force_login(self.student1)
+        with mock.patch('course_module.serializers.submit_request', side_effect=IntegrityError('unique')):
+            response = self.client.post(reverse('courserequest-list'),
+                                        data=dict(active_course_id=self.container_relations[0].id))
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
     def test_auto_accept_on_little_quantity(self):
         url = reverse('courserequest-list')
         self.client.force_login(self.student1)
@@ -209,6 +225,17 @@ class RequestsAPITestCase(APITestCase):
         print(response.data)
         self.assertEqual(len(self.requests_for_pr1), response.data['count'])
 
+    def test_filter_by_course(self):
+        second_year = mommy.make(StudyGroup, start_year=date(get_academic_year() - 1, 9, 1))
+        mommy.make(ContainerToGroup, container=self.container, group=second_year)
+        mommy.make(ContainerToGroup, container=self.container, group=mommy.make(StudyGroup, start_year=date(
+            get_academic_year() - 1, 10, 1)))
+        self.client.force_login(self.deanery)
+        response = self.client.get(reverse('courserequest-list'), data=dict(course=2))
+        self.assertEqual(len(self.requests_for_pr1), response.data['count'])
+        response = self.client.get(reverse('courserequest-list'), data=dict(course=1))
+        self.assertEqual(0, response.data['count'])
+
     def test_student_cant_accept_request(self):
         self.client.force_login(self.student1)
         url = reverse('courserequest-accept-request')
@@ -250,3 +277,107 @@ class RequestsAPITestCase(APITestCase):
         url = reverse('courserequest-list')
         response = self.client.post(url, data=dict(active_course_id=new_course.id))
         self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_reject_accepts_head_of_waitlist(self):
+        CourseRequest.objects.filter(active_course=self.container_relations[0]).delete()
+        waiting_requests = []
+        for score in (3, 7, 5):
+            user = mommy.make(User)
+            user.groups.add(Group.objects.get(name='Students'))
+            user.student_profile.score = score
+            user.student_profile.save()
+            waiting_requests.append(mommy.make(CourseRequest, active_course=self.container_relations[0],
+                                               student=user))
+        accepted_request = mommy.make(CourseRequest, active_course=self.container_relations[0],
+                                      student=self.student1, status=ACCEPTED)
+        self.client.force_login(self.professor1)
+        url = reverse('courserequest-reject-request')
+        response = self.client.post(url, data=dict(id=accepted_request.id))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([SUBMITTED, ACCEPTED, SUBMITTED],
+                         [CourseRequest.objects.get(pk=obj.id).status for obj in waiting_requests])
+
+    def test_reject_of_waiting_request_keeps_waitlist(self):
+        CourseRequest.objects.filter(active_course=self.container_relations[0]).delete()
+        waiting_requests = mommy.make(CourseRequest, active_course=self.container_relations[0], _quantity=2)
+        self.client.force_login(self.professor1)
+        url = reverse('courserequest-reject-request')
+        response = self.client.post(url, data=dict(id=waiting_requests[0].id))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(SUBMITTED, CourseRequest.objects.get(pk=waiting_requests[1].id).status)
+
+    def test_score_snapshot_follows_student_profile(self):
+        request = mommy.make(CourseRequest, active_course=self.container_relations[0], student=self.student1)
+        self.assertEqual(0, request.score)
+        self.student1.student_profile.score = 42
+        self.student1.student_profile.save()
+        self.assertEqual(42, CourseRequest.objects.get(pk=request.id).score)
+
+    def test_counters_follow_status_transitions(self):
+        relation = self.container_relations[0]
+        relation.refresh_from_db()
+        self.assertEqual((0, 3), (relation.accepted_count, relation.active_count))
+        accepted_request = mommy.make(CourseRequest, active_course=relation, status=ACCEPTED)
+        self.requests_for_pr1[0].status = REJECTED
+        self.requests_for_pr1[0].save()
+        relation.refresh_from_db()
+        self.assertEqual((1, 3), (relation.accepted_count, relation.active_count))
+        accepted_request.delete()
+        self.requests_for_pr1[1].status = ACCEPTED
+        self.requests_for_pr1[1].save()
+        relation.refresh_from_db()
+        self.assertEqual((1, 2), (relation.accepted_count, relation.active_count))
+
+    def test_counters_follow_moved_request(self):
+        old_relation, new_relation = self.container_relations
+        request = CourseRequest.objects.get(pk=self.requests_for_pr1[0].pk)
+        request.status = ACCEPTED
+        request.save()
+        request.active_course = new_relation
+        request.save()
+        counters = {relation.id: (relation.accepted_count, relation.active_count,
+                                  relation.statistics.accepted_count, relation.statistics.submitted_count)
+                    for relation in ContainerToCourse.objects.select_related('statistics')}
+        self.assertEqual((0, 2, 0, 2), counters[old_relation.id])
+        self.assertEqual((1, 1, 1, 0), counters[new_relation.id])
+
+    def test_rebuild_counters_command(self):
+        ContainerToCourse.objects.update(accepted_count=100, active_count=100)
+        call_command('rebuild_course_counters', stdout=StringIO())
+        relation = ContainerToCourse.objects.get(pk=self.container_relations[0].id)
+        self.assertEqual((0, 3), (relation.accepted_count, relation.active_count))
+        relation = ContainerToCourse.objects.get(pk=self.container_relations[1].id)
+        self.assertEqual((0, 0), (relation.accepted_count, relation.active_count))
+
+    def test_bulk_decide(self):
+        accepted_elsewhere = mommy.make(CourseRequest, active_course=self.container_relations[1], status=ACCEPTED)
+        request_of_accepted = mommy.make(CourseRequest, active_course=self.container_relations[0],
+                                         student=accepted_elsewhere.student)
+        decisions = [
+            dict(id=self.requests_for_pr1[0].id, decision='accept'),
+            dict(id=self.requests_for_pr1[1].id, decision='reject'),
+            dict(id=request_of_accepted.id, decision='accept'),
+            dict(id=accepted_elsewhere.id, decision='reject'),
+        ]
+        self.client.force_login(self.professor1)
+        response = self.client.post(reverse('courserequest-bulk-decide'), data=decisions, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([ACCEPTED, REJECTED, None, None], [item.get('status') for item in response.data])
+        self.assertTrue(response.data[2]['error'])
+        self.assertTrue(response.data[3]['error'])
+        self.assertEqual(ACCEPTED, CourseRequest.objects.get(pk=self.requests_for_pr1[0].id).status)
+        self.assertEqual(REJECTED, CourseRequest.objects.get(pk=self.requests_for_pr1[1].id).status)
+        self.assertEqual(ACCEPTED, CourseRequest.objects.get(pk=accepted_elsewhere.id).status)
+
+    def test_bulk_decide_query_count_does_not_depend_on_batch_size(self):
+        self.client.force_login(self.professor2)
+        url = reverse('courserequest-bulk-decide')
+        query_counts = []
+        for size in (5, 50):
+            requests = mommy.make(CourseRequest, active_course=self.container_relations[1], _quantity=size)
+            decisions = [dict(id=obj.id, decision='reject') for obj in requests]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(url, data=decisions, format='json')
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[0], query_counts[1])
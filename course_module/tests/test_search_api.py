@@ -0,0 +1,78 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.checks import check_search_triggers
+from course_module.models import Course, CourseContainer, ContainerToCourse
+from course_module.search import SEARCH_TRIGGERS
+from eITIS.enums import CLOSED
+from user_module.models import User
+
+
+class SearchAPITestCase(APITestCase):
+    cards_url = '/course_api/cards/'
+    search_url = '/course_api/cards/search/'
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = mommy.make(User)
+        self.user.groups.add(Group.objects.get(name='Students'))
+        self.client.force_authenticate(self.user)
+        container = mommy.make(CourseContainer)
+        self.courses = [
+            Course.objects.create(name='Анализ данных', description='Статистика и программирование на Python'),
+            Course.objects.create(name='Программирование на Python', description='Основы языка',
+                                  requirements='Информатика'),
+            Course.objects.create(name='История искусства', description='Живопись эпохи Возрождения'),
+        ]
+        self.cards = [mommy.make(ContainerToCourse, container=container, course=course) for course in self.courses]
+
+    def found(self, url, **data):
+        response = self.client.get(url, data=data)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        results = response.data['results'] if 'results' in response.data else response.data
+        return [card['id'] for card in results]
+
+    def test_filter_by_words_of_any_field(self):
+        self.assertEqual([self.cards[0].id, self.cards[1].id], self.found(self.cards_url, q='python'))
+        # words are matched by prefixes and without case
+        self.assertEqual([self.cards[0].id, self.cards[1].id], self.found(self.cards_url, q='ПРОГРАММ'))
+        self.assertEqual([self.cards[1].id], self.found(self.cards_url, q='python информатик'))
+        self.assertEqual([self.cards[2].id], self.found(self.cards_url, q='возрождения'))
+        self.assertEqual([], self.found(self.cards_url, q='химия'))
+        self.assertEqual([], self.found(self.cards_url, q='"*'))
+
+    def test_filter_is_served_by_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.found(self.cards_url, q='python')
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('LIKE', sql)
+        if connection.vendor == 'sqlite':
+            self.assertIn('MATCH', sql)
+
+    def test_ranked_search(self):
+        # match in name weighs more than match in description
+        self.assertEqual([self.cards[1].id, self.cards[0].id], self.found(self.search_url, q='программирование'))
+        self.assertEqual([self.cards[1].id], self.found(self.search_url, q='программирование', limit=1))
+        self.assertEqual([], self.found(self.search_url, q='python', container__status=CLOSED))
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, self.client.get(self.search_url).status_code)
+
+    def test_index_follows_changes_of_courses(self):
+        self.courses[2].description = 'Искусство программирования'
+        self.courses[2].save()
+        self.assertEqual([card.id for card in self.cards], self.found(self.cards_url, q='программ'))
+        self.courses[0].delete()
+        self.assertEqual([self.cards[1].id, self.cards[2].id], self.found(self.cards_url, q='программ'))
+        self.assertEqual([], self.found(self.cards_url, q='анализ'))
+
+    def test_search_triggers_exist(self):
+        self.assertEqual([], check_search_triggers(None))
+        if connection.vendor == 'sqlite':
+            # like a migration which rebuilds the table of courses
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TRIGGER {}'.format(SEARCH_TRIGGERS['sqlite'][2]))
+            self.assertEqual(['course_module.W001'], [error.id for error in check_search_triggers(None)])
@@ -0,0 +1,28 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APITransactionTestCase
+
+from course_module.models import CourseContainer, CourseRequest
+from user_module.models import User
+
+
+class SimulateEnrollmentTestCase(APITransactionTestCase):
+    # groups and permissions are created by migrations, keep them after flush
+    serialized_rollback = True
+
+    def test_simulation(self):
+        stdout = StringIO()
+        call_command('simulate_enrollment', students=30, courses=4, containers=2, threads=4, quantity=3,
+                     seed=1, stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual('capacity violations: 0', lines[-1])
+        rows = {line.split()[0]: line.split()[1:] for line in lines}
+        for kind in ('browse', 'submit', 'withdraw', 'decide'):
+            count, server_errors = rows[kind][0], rows[kind][2]
+            self.assertTrue(int(count) > 0, kind)
+            self.assertEqual('0', server_errors, kind)
+        # seeded data is removed
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(CourseContainer.objects.exists())
+        self.assertFalse(CourseRequest.objects.exists())
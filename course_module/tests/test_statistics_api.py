@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from course_module.models import CourseContainer, ContainerToCourse, CourseHead, CourseRequest, CourseStatistics, \
+    CourseToInstitute
+from eITIS.enums import SUBMITTED, ACCEPTED, REJECTED
+from eITIS.tests.helpers import make_user
+from study_group_module.models import Institute
+
+
+class StatisticsAPITestCase(APITestCase):
+    def setUp(self):
+        self.deanery = make_user('Deanery_Workers')
+        self.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+        self.professor = make_user('Professors')
+        self.container = mommy.make(CourseContainer, created_by=self.deanery)
+        # students can take one course of container, so courses are in different containers
+        self.relations = [mommy.make(ContainerToCourse, container=container, instant_accept=instant_accept,
+                                     quantity=2, min_quantity=1)
+                          for container, instant_accept in ((self.container, False), (mommy.make(CourseContainer), True))]
+        for relation in self.relations:
+            mommy.make(CourseHead, course=relation, curator=self.professor)
+        self.institute = mommy.make(Institute)
+        mommy.make(CourseToInstitute, course=self.relations[0].course, institute=self.institute)
+        mommy.make(CourseToInstitute, course=self.relations[1].course, institute=self.institute)
+        self.students = []
+        for score in (60, 70, 80, 90):
+            student = make_user('Students')
+            student.student_profile.score = score
+            student.student_profile.save()
+            self.students.append(student)
+
+    def submit(self, student, relation):
+        self.client.force_authenticate(student)
+        response = self.client.post(reverse('courserequest-list'), data=dict(active_course_id=relation.id))
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        return CourseRequest.objects.get(student=student, active_course=relation)
+
+    def decide(self, action, request):
+        self.client.force_authenticate(self.professor)
+        response = self.client.post(reverse('courserequest-{}-request'.format(action)), data=dict(id=request.id))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def assertStatisticsMatchRequests(self):
+        for relation in self.relations:
+            requests = CourseRequest.objects.filter(active_course=relation)
+            scores = sorted(requests.filter(status=ACCEPTED).values_list('score', flat=True))
+            statistics = CourseStatistics.objects.get(course=relation)
+            self.assertEqual(
+                (requests.filter(status=SUBMITTED).count(), len(scores), requests.filter(status=REJECTED).count(),
+                 sum(scores) / len(scores) if scores else None, scores[0] if scores else None),
+                (statistics.submitted_count, statistics.accepted_count, statistics.rejected_count,
+                 statistics.average_score, statistics.cutoff_score))
+
+    def test_statistics_follow_requests(self):
+        requests = [self.submit(student, self.relations[0]) for student in self.students[:3]]
+        self.decide('accept', requests[0])
+        self.decide('accept', requests[2])
+        self.decide('reject', requests[1])
+        self.assertStatisticsMatchRequests()
+        self.decide('reject', requests[0])
+        self.assertStatisticsMatchRequests()
+        # instant-accept course gives seats to the best students
+        for student in self.students:
+            self.submit(student, self.relations[1])
+        self.assertStatisticsMatchRequests()
+        self.client.force_authenticate(self.professor)
+        self.client.patch(reverse('containertocourse-detail', kwargs=dict(pk=self.relations[1].id)),
+                          data=dict(quantity=3))
+        self.assertStatisticsMatchRequests()
+        self.client.force_authenticate(self.students[3])
+        self.client.delete(reverse('courserequest-detail', kwargs=dict(
+            pk=CourseRequest.objects.get(student=self.students[3], active_course=self.relations[1]).id)))
+        self.assertStatisticsMatchRequests()
+        profile = self.students[1].student_profile
+        profile.score = 100
+        profile.save()
+        self.assertStatisticsMatchRequests()
+
+    def test_bulk_decide(self):
+        requests = [self.submit(student, self.relations[0]) for student in self.students]
+        self.client.force_authenticate(self.professor)
+        self.client.post(reverse('courserequest-bulk-decide'), format='json', data=[
+            dict(id=requests[0].id, decision='accept'), dict(id=requests[1].id, decision='reject')])
+        self.assertStatisticsMatchRequests()
+
+    def test_list_does_not_depend_on_requests(self):
+        self.client.force_authenticate(self.deanery)
+        url = reverse('coursestatistics-list')
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        for student in self.students:
+            mommy.make(CourseRequest, student=student, active_course=self.relations[0], status=ACCEPTED)
+        with self.assertNumQueries(2):
+            response = self.client.get(url, data=dict(container=self.container.id))
+        self.assertEqual([4], [row['accepted_count'] for row in response.data['results']])
+        self.assertEqual(75, response.data['results'][0]['average_score'])
+
+    def test_institutes(self):
+        for student in self.students:
+            self.submit(student, self.relations[1])
+        self.client.force_authenticate(self.deanery)
+        response = self.client.get(reverse('coursestatistics-institutes'))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([dict(institute=self.institute.id, name=self.institute.name, courses=2, submitted_count=2,
+                               accepted_count=2, rejected_count=0, average_score=85, cutoff_score=80)],
+                         [dict(row) for row in response.data])
+
+    def test_only_deanery(self):
+        for user in (self.students[0], self.professor):
+            self.client.force_authenticate(user)
+            self.assertEqual(status.HTTP_403_FORBIDDEN,
+                             self.client.get(reverse('coursestatistics-list')).status_code)
+
+    def test_rebuild_command(self):
+        mommy.make(CourseRequest, student=self.students[0], active_course=self.relations[0], status=ACCEPTED)
+        CourseStatistics.objects.filter(course=self.relations[0]).update(accepted_count=10, cutoff_score=None)
+        CourseStatistics.objects.filter(course=self.relations[1]).delete()
+        stdout = StringIO()
+        call_command('rebuild_course_statistics', container=[self.container.id], stdout=stdout)
+        self.assertTrue('Rebuilt statistics of 1 courses (0 created)' in stdout.getvalue())
+        call_command('rebuild_course_statistics', stdout=stdout)
+        self.assertTrue('Rebuilt statistics of 2 courses (1 created)' in stdout.getvalue())
+        self.assertStatisticsMatchRequests()
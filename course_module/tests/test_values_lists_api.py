@@ -0,0 +1,70 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import Permission
+from django.core.management import call_command
+from django.test.utils import override_settings
+from django.urls import reverse
+from model_mommy import mommy
+from rest_framework.test import APITestCase
+
+from course_module.cache import get_cache
+from course_module.models import Course, CourseContainer, ContainerToCourse, CourseHead, CourseRequest
+from eITIS.tests.helpers import make_user
+from study_group_module.models import StudyGroup
+from user_module.models import User
+
+
+class ValuesListsAPITestCase(APITestCase):
+    def setUp(self):
+        self.deanery = make_user('Deanery_Workers')
+        self.deanery.user_permissions.add(Permission.objects.get(codename='deanery_recruitment_creator'))
+        self.professors = [make_user('Professors', photo='avatars/{}.png'.format(i)) for i in range(3)]
+        self.container = mommy.make(CourseContainer)
+        self.relations = [
+            mommy.make(ContainerToCourse, container=self.container, quantity=quantity,
+                       course=mommy.make(Course, logo='uploads/{}.png'.format(index) if index else ''))
+            for index, quantity in enumerate((None, 2, 10))
+        ]
+        # heads are added not in order of ids, one card has no heads
+        for relation, professor in ((self.relations[0], self.professors[2]), (self.relations[0], self.professors[0]),
+                                    (self.relations[1], self.professors[1])):
+            mommy.make(CourseHead, course=relation, curator=professor)
+        self.students = [make_user('Students') for i in range(4)]
+        self.students[0].student_profile.group = mommy.make(StudyGroup)
+        self.students[0].student_profile.save()
+        for index, student in enumerate(self.students):
+            mommy.make(CourseRequest, student=student, active_course=self.relations[index % 3], message='m')
+            mommy.make(CourseRequest, student=student, active_course=mommy.make(ContainerToCourse))
+
+    def assertSameLists(self, user, url, **data):
+        self.client.force_authenticate(user)
+        contents = []
+        for values in (False, True):
+            get_cache().clear()
+            with override_settings(COURSE_VALUES_LISTS=values):
+                contents.append(json.loads(self.client.get(url, data=data).content.decode()))
+        self.assertTrue(contents[0]['results'])
+        self.assertEqual(contents[0], contents[1])
+
+    def test_cards(self):
+        for user in (self.students[0], self.professors[0], self.deanery):
+            self.assertSameLists(user, reverse('containertocourse-list'))
+        self.assertSameLists(self.students[0], reverse('containertocourse-list'), container=self.container.id,
+                             limit=2)
+        self.assertSameLists(self.professors[0], reverse('containertocourse-list'), my=True)
+
+    def test_requests(self):
+        for user in (self.students[0], self.students[1], self.professors[0], self.deanery):
+            self.assertSameLists(user, reverse('courserequest-list'))
+        self.assertSameLists(self.deanery, reverse('courserequest-list'), container=self.container.id, limit=3)
+
+    def test_benchmark_command(self):
+        stdout = StringIO()
+        get_cache().set('other_entry', 1)
+        call_command('benchmark_values_lists', rows=10, repeat=1, stdout=stdout)
+        # the cache may be shared, the benchmark doesn't clear it
+        self.assertEqual(1, get_cache().get('other_entry'))
+        self.assertTrue('cards: serializers' in stdout.getvalue())
+        self.assertTrue('requests: serializers' in stdout.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='sim').exists())
@@ -1,13 +1,17 @@
 from rest_framework import routers
 
 
-from .views import CourseCardViewSet, CourseContainerViewSet, CourseRequestViewSet, ContainerRelationViewSet
+from .views import CourseCardViewSet, CourseContainerViewSet, CourseRequestViewSet, ContainerRelationViewSet, \
+    RequestTicketViewSet, CourseStatisticsViewSet, StudentEnrollmentViewSet
 
 router = routers.DefaultRouter()
 router.register(r'cards', CourseCardViewSet)
 router.register(r'containers', CourseContainerViewSet)
 router.register(r'requests', CourseRequestViewSet)
 router.register(r'containerrelations', ContainerRelationViewSet)
+router.register(r'tickets', RequestTicketViewSet)
+router.register(r'stats', CourseStatisticsViewSet)
+router.register(r'enrollment', StudentEnrollmentViewSet, basename='enrollment')
 
 urlpatterns = []
 urlpatterns += router.urls
@@ -0,0 +1,113 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+
+from eITIS.serializers import FIELDS_PARAM, EXPAND_PARAM
+
+VALUE, FILE, PK, NESTED, MANY = range(5)
+
+
+class ValuesSerializer:
+    # builds the same output as serializer from rows of .values(), without model instances and serializer
+    # instances per row. Related lists (heads) are read by one more query per list field.
+    # Fields of serializer are taken once, so any serializer of plain model fields, foreign keys and nested
+    # serializers works, properties are mapped to columns by Meta.values_lookups
+    def __init__(self, serializer, prefix=''):
+        self.lookups = set()
+        self.many = []
+        self.columns = self.compile(serializer, prefix)
+
+    def compile(self, serializer, prefix):
+        model = serializer.Meta.model
+        values_lookups = getattr(serializer.Meta, 'values_lookups', {})
+        columns = []
+        for field in serializer._readable_fields:
+            source = values_lookups.get(field.source, '__'.join(field.source_attrs))
+            lookup = prefix + source
+            if isinstance(field, serializers.ListSerializer):
+                child = ValuesSerializer(field.child, source + '__')
+                if child.many:
+                    raise ImproperlyConfigured('Списки внутри списков не поддерживаются: {}'.format(lookup))
+                pk_lookup = prefix + model._meta.pk.name
+                self.lookups.add(pk_lookup)
+                self.many.append((model, pk_lookup, source, child))
+                columns.append((MANY, field.field_name, pk_lookup, len(self.many) - 1))
+            elif isinstance(field, serializers.BaseSerializer):
+                pk_lookup = '{}__{}'.format(lookup, field.Meta.model._meta.pk.name)
+                self.lookups.add(pk_lookup)
+                # serializer skips missing object of reverse one-to-one (profile), and shows None for foreign key
+                model_field = model._meta.get_field(source)
+                skip_missing = model_field.one_to_one and not model_field.concrete
+                columns.append((NESTED, field.field_name, pk_lookup,
+                                (self.compile(field, lookup + '__'), skip_missing)))
+            elif isinstance(field, RelatedField):
+                self.lookups.add(lookup)
+                columns.append((PK, field.field_name, lookup, None))
+            elif isinstance(field, serializers.FileField):
+                self.lookups.add(lookup)
+                columns.append((FILE, field.field_name, lookup, (field, model._meta.get_field(source))))
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.ManyRelatedField)):
+                raise ImproperlyConfigured('Поле {} нельзя прочитать через values()'.format(lookup))
+            else:
+                self.lookups.add(lookup)
+                columns.append((VALUE, field.field_name, lookup, field))
+        return columns
+
+    def get_values(self, queryset):
+        return queryset.prefetch_related(None).values(*self.lookups)
+
+    def get_many(self, rows):
+        results = []
+        for model, pk_lookup, source, child in self.many:
+            ids = {row[pk_lookup] for row in rows if row[pk_lookup] is not None}
+            child_rows = defaultdict(list)
+            child_pk_lookup = source + '__pk'
+            queryset = model.objects.filter(pk__in=ids, **{child_pk_lookup + '__isnull': False})
+            for child_row in queryset.order_by('pk', child_pk_lookup).values('pk', *child.lookups):
+                child_rows[child_row['pk']].append(child_row)
+            results.append({pk: child.to_representation(items) for pk, items in child_rows.items()})
+        return results
+
+    def to_representation(self, rows):
+        many = self.get_many(rows)
+        return [self.build(row, self.columns, many) for row in rows]
+
+    def build(self, row, columns, many):
+        data = {}
+        for kind, name, lookup, extra in columns:
+            if kind == MANY:
+                data[name] = many[extra].get(row[lookup], [])
+                continue
+            value = row[lookup]
+            if value is None:
+                if kind != NESTED or not extra[1]:
+                    data[name] = None
+            elif kind == NESTED:
+                data[name] = self.build(row, extra[0], many)
+            elif kind == PK:
+                data[name] = value
+            elif kind == FILE:
+                field, model_field = extra
+                data[name] = field.to_representation(model_field.attr_class(None, model_field, value))
+            else:
+                data[name] = extra.to_representation(value)
+        return data
+
+
+class ValuesListMixin:
+    # with COURSE_VALUES_LISTS list is built by ValuesSerializer, responses with ?fields= and ?expand=
+    # are still built by serializers
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if not settings.COURSE_VALUES_LISTS or FIELDS_PARAM in params or EXPAND_PARAM in params:
+            return super().list(request, *args, **kwargs)
+        values_serializer = ValuesSerializer(self.get_serializer())
+        rows = values_serializer.get_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(list(rows)))
@@ -1,7 +1,16 @@
-from django.db import transaction
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router
+from django.db.models import F, Count, Sum, Min
+from django.http import StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 
 from rest_framework.mixins import ListModelMixin, RetrieveModelMixin, CreateModelMixin, DestroyModelMixin, \
     UpdateModelMixin
@@ -10,71 +19,232 @@ from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
 
-from course_module.helpers import delete_request, reject_request, accept_request
-from user_module.permissions import OnlyStudentCanCreate, ProfessorPermission
-from course_module.filters import ContainerFilterSet, RequestFilterSet, CourseCardFilterSet
-from .models import CourseContainer, CourseRequest, ContainerToCourse
+from eITIS.enums import OPENED
+from course_module.cache import (CachedResponseMixin, ConditionalResponseMixin, STRUCTURE_VERSION, REQUESTS_VERSION,
+                                 container_scopes)
+from course_module.helpers import delete_request, reject_request, accept_request, decide_requests, \
+    get_request_position, get_pending_requests
+from user_module.models import User
+from user_module.permissions import OnlyStudentCanCreate, StudentPermission, ProfessorPermission, \
+    DeaneryPermission
+from course_module.pagination import KeysetPagination
+from course_module.search import rank_courses
+from course_module.export import get_export_rows, stream_csv, stream_xlsx, XLSX_CONTENT_TYPE
+from eITIS.serializers import FieldSelection
+from course_module.filters import ContainerFilterSet, RequestFilterSet, CourseCardFilterSet, StatisticsFilterSet
+from course_module.values import ValuesListMixin
+from .models import CourseContainer, CourseRequest, ContainerToCourse, RequestTicket, CourseStatistics, \
+    ContainerToGroup, get_heads_prefetch
 from .serializers import (ShortCourseContainerSerializer,
                           CourseRequestSerializer, ExtendedCourseRequestSerializer,
-                          ProfessorUpdateRelationSerializer, RelationSerializer, RelationWithExtendedCourseSerializer)
+                          ProfessorUpdateRelationSerializer, RelationSerializer, RelationWithExtendedCourseSerializer,
+                          RequestDecisionSerializer, RequestTicketSerializer, CourseStatisticsSerializer,
+                          InstituteStatisticsSerializer, DashboardCardSerializer, EnrollmentSerializer)
 from django_filters import rest_framework as filters
 
 
-class CourseCardViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+# waiting requests shown for each course in professor dashboard, ?pending= changes it up to the maximum
+DASHBOARD_PENDING_REQUESTS = 5
+DASHBOARD_MAX_PENDING_REQUESTS = 50
+# cards shown by ranked search, ?limit= changes it up to the maximum
+SEARCH_RESULTS = 20
+SEARCH_MAX_RESULTS = 100
+
+
+class CourseCardViewSet(ConditionalResponseMixin, CachedResponseMixin, ValuesListMixin, ListModelMixin,
+                        RetrieveModelMixin, GenericViewSet):
     queryset = ContainerToCourse.objects.all()
     serializer_class = RelationSerializer
+    pagination_class = KeysetPagination
     filterset_class = CourseCardFilterSet
     filter_backends = (filters.DjangoFilterBackend,)
     permission_classes = (IsAuthenticated,)
 
+    def get_queryset(self):
+        # only relations which are asked by ?fields= and ?expand= are fetched
+        selection = FieldSelection.from_request(self.request)
+        return super().get_queryset().with_card_details(course=selection.expands('course'),
+                                                        container=selection.expands('container'),
+                                                        heads=selection.includes('heads'))
+
+    def get_cache_owner(self):
+        if self.action == 'position':
+            return 'user:{}'.format(self.request.user.id)
+        return super().get_cache_owner()
+
+    def get_version_scopes(self):
+        # cards of one container change only with requests of this container
+        if self.action in ('retrieve', 'position'):
+            container_ids = ContainerToCourse.objects.filter(pk=self.kwargs['pk']).values_list('container_id',
+                                                                                             flat=True)
+        elif self.request.query_params.get('container', '').isdigit():
+            container_ids = [self.request.query_params['container']]
+        else:
+            return [STRUCTURE_VERSION, REQUESTS_VERSION]
+        return [STRUCTURE_VERSION] + container_scopes(container_ids)
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return RelationWithExtendedCourseSerializer
         return super().get_serializer_class()
 
+    @action(detail=True)
+    def position(self, request, pk=None):
+        # polled by students, so it is cached until requests of the container change
+        return self.versioned_response(self.build_position, request, pk=pk)
+
+    @action(detail=False)
+    def search(self, request):
+        # cards of courses found by ?q= from the most relevant, other filters of cards work too
+        return self.versioned_response(self.build_search, request)
+
+    @action(detail=False, permission_classes=(ProfessorPermission,))
+    def dashboard(self, request):
+        # all courses of professor with statistics and the best waiting requests, in a fixed number of queries
+        limit = request.query_params.get('pending', '')
+        limit = min(int(limit), DASHBOARD_MAX_PENDING_REQUESTS) if limit.isdigit() else DASHBOARD_PENDING_REQUESTS
+        cards = list(ContainerToCourse.objects.filter(
+            id__in=request.user.professor_course_head_relations.values('course_id')
+        ).with_card_details().select_related('statistics').order_by('id'))
+        pending = defaultdict(list)
+        for course_request in get_pending_requests([card.id for card in cards], limit).select_related(
+                'student__student_profile__group'):
+            pending[course_request.active_course_id].append(course_request)
+        for card in cards:
+            card.pending_requests = pending[card.id]
+        serializer = DashboardCardSerializer(cards, many=True, context=self.get_serializer_context())
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    def build_search(self, request):
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            raise ValidationError({'q': 'Укажите строку поиска'})
+        limit = request.query_params.get('limit', '')
+        limit = min(int(limit), SEARCH_MAX_RESULTS) if limit.isdigit() else SEARCH_RESULTS
+        ranks = rank_courses(query)
+        queryset = self.filter_queryset(self.get_queryset())
+        found = sorted(queryset.values_list('id', 'course_id'), key=lambda card: (-ranks.get(card[1], 0), card[0]))
+        ids = [card_id for card_id, course_id in found[:limit]]
+        cards = sorted(queryset.filter(id__in=ids), key=lambda card: ids.index(card.id))
+        return Response(data=self.get_serializer(cards, many=True).data, status=status.HTTP_200_OK)
+
+    def build_position(self, request, pk=None):
+        card = get_object_or_404(ContainerToCourse.objects.values(
+            'id', 'quantity', 'accepted_count', 'active_count', cutoff_score=F('statistics__cutoff_score')), pk=pk)
+        course_request, position = get_request_position(card['id'], request.user)
+        return Response(data=dict(
+            course=card['id'], quantity=card['quantity'], accepted_requests=card['accepted_count'],
+            all_requests=card['active_count'], cutoff_score=card['cutoff_score'],
+            request_status=course_request['status'] if course_request else None, position=position,
+        ))
 
-class CourseContainerViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+
+class CourseContainerViewSet(ConditionalResponseMixin, CachedResponseMixin, ListModelMixin, RetrieveModelMixin,
+                             GenericViewSet):
     queryset = CourseContainer.objects.all()
     serializer_class = ShortCourseContainerSerializer
     filterset_class = ContainerFilterSet
     filter_backends = (filters.DjangoFilterBackend,)
     permission_classes = (IsAuthenticated,)
 
+    @action(detail=True, url_path='export/(?P<file_type>csv|xlsx)', permission_classes=(DeaneryPermission,))
+    def export(self, request, pk=None, file_type=None):
+        # accepted students of courses of container (or of one course by ?course=) streamed from a cursor,
+        # so memory doesn't grow with the number of rows
+        container = self.get_object()
+        requests = CourseRequest.objects.using(router.db_for_read(CourseRequest)).filter(
+            active_course__container=container)
+        if request.query_params.get('course', '').isdigit():
+            requests = requests.filter(active_course=request.query_params['course'])
+        rows = get_export_rows(requests)
+        if file_type == 'xlsx':
+            response = StreamingHttpResponse(stream_xlsx(rows), content_type=XLSX_CONTENT_TYPE)
+        else:
+            response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+            # xlsx is a zip archive already
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+                response.streaming_content = compress_sequence(response.streaming_content)
+                response['Content-Encoding'] = 'gzip'
+        response['Content-Disposition'] = 'attachment; filename="container_{}.{}"'.format(container.id, file_type)
+        return response
+
 
-class CourseRequestViewSet(ListModelMixin, RetrieveModelMixin,
+class CourseRequestViewSet(ConditionalResponseMixin, ValuesListMixin, ListModelMixin, RetrieveModelMixin,
                            CreateModelMixin, DestroyModelMixin, GenericViewSet):
     queryset = CourseRequest.objects.all()
     serializer_class = ExtendedCourseRequestSerializer
+    pagination_class = KeysetPagination
     permission_classes = (OnlyStudentCanCreate,)
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = RequestFilterSet
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        if self.request.user.role is 'student':
+        if self.action in ('list', 'retrieve'):
+            # only relations which are asked by ?fields= and ?expand= are fetched
+            selection = FieldSelection.from_request(self.request)
+            paths = ['student.student_profile.group']
+            if self.get_serializer_class() is ExtendedCourseRequestSerializer:
+                paths += ['active_course.course', 'active_course.container']
+                if selection.includes('active_course.heads'):
+                    queryset = queryset.prefetch_related(get_heads_prefetch('active_course__heads'))
+            related = set(filter(None, (selection.join_path(path) for path in paths)))
+            if selection.includes('student.student_profile'):
+                # id of profile isn't stored in the row of user
+                related.add('student__student_profile')
+            if related:
+                queryset = queryset.select_related(*related)
+        if self.request.user.role == 'student':
             return queryset.filter(id__in=self.request.user.student_course_requests.values_list('id'))
-        if self.request.user.role is 'professor':
+        if self.request.user.role == 'professor':
             professor_courses_detail = self.request.user.professor_course_head_relations
             return queryset.filter(active_course_id__in=professor_courses_detail.values_list('course_id'))
         return queryset
 
+    def get_cache_owner(self):
+        return 'user:{}'.format(self.request.user.id)
+
+    def get_version_scopes(self):
+        # requests are shown together with cards of their courses, so they follow versions of their containers
+        if self.action == 'retrieve':
+            container_ids = self.get_queryset().filter(pk=self.kwargs['pk']).values_list(
+                'active_course__container_id', flat=True)
+        elif self.request.user.role == 'student':
+            container_ids = self.request.user.student_course_requests.values_list('active_course__container_id',
+                                                                                  flat=True)
+        elif self.request.user.role == 'professor':
+            container_ids = self.request.user.professor_course_head_relations.values_list('course__container_id',
+                                                                                          flat=True)
+        else:
+            return [STRUCTURE_VERSION, REQUESTS_VERSION]
+        return [STRUCTURE_VERSION] + container_scopes(container_ids)
+
     def get_serializer_class(self):
         role = self.request.user.role
-        if role is 'student':
+        if role == 'student':
             return ExtendedCourseRequestSerializer
-        if role is 'professor':
+        if role == 'professor':
             return CourseRequestSerializer
         else:
             return CourseRequestSerializer
 
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
+        if settings.COURSE_REQUESTS_INTAKE_QUEUE:
+            return self.enqueue(request)
         serializer = self.get_serializer(data=request.data, context=self.get_serializer_context())
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(data="[]", status=status.HTTP_201_CREATED, headers=headers)
 
+    def enqueue(self, request):
+        # request is only stored in the queue, process_request_queue command validates and allocates it
+        serializer = RequestTicketSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        serializer.save(student=request.user)
+        return Response(data=serializer.data, status=status.HTTP_202_ACCEPTED)
+
     def perform_destroy(self, instance):
         delete_request(instance)
         return Response(data="[]", status=status.HTTP_200_OK)
@@ -93,6 +263,22 @@ class CourseRequestViewSet(ListModelMixin, RetrieveModelMixin,
         serializer = self.get_serializer(course_request)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=['POST'], detail=False, permission_classes=(ProfessorPermission,))
+    def bulk_decide(self, request):
+        serializer = RequestDecisionSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        results = decide_requests(self.get_queryset(), serializer.validated_data)
+        return Response(data=results, status=status.HTTP_200_OK)
+
+
+class RequestTicketViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = RequestTicket.objects.select_related('request')
+    serializer_class = RequestTicketSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return super().get_queryset().filter(student=self.request.user)
+
 
 class ContainerRelationViewSet(UpdateModelMixin, GenericViewSet):
     queryset = ContainerToCourse.objects.all()
@@ -102,3 +288,45 @@ class ContainerRelationViewSet(UpdateModelMixin, GenericViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         return queryset.filter(heads=self.request.user)
+
+
+class CourseStatisticsViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    # only maintained summary rows are read, so answers don't depend on the number of requests
+    queryset = CourseStatistics.objects.select_related('course__course').order_by('course_id')
+    serializer_class = CourseStatisticsSerializer
+    permission_classes = (DeaneryPermission,)
+    filter_backends = (filters.DjangoFilterBackend,)
+    filterset_class = StatisticsFilterSet
+
+    @action(detail=False)
+    def institutes(self, request):
+        institute = 'course__course__course_institute_relations__institute'
+        rows = self.filter_queryset(self.get_queryset()).filter(**{institute + '__isnull': False}).values(
+            institute=F(institute), name=F(institute + '__name'),
+        ).annotate(
+            courses=Count('pk'), submitted=Sum('submitted_count'), accepted=Sum('accepted_count'),
+            rejected=Sum('rejected_count'), score_sum=Sum('accepted_score_sum'), cutoff=Min('cutoff_score'),
+        ).order_by('institute')
+        return Response(InstituteStatisticsSerializer(rows, many=True).data)
+
+
+class StudentEnrollmentViewSet(GenericViewSet):
+    # everything the student sees after login: his profile, open containers of his group with their cards
+    # and his requests, in a fixed number of queries
+    queryset = CourseContainer.objects.all()
+    serializer_class = EnrollmentSerializer
+    permission_classes = (StudentPermission,)
+
+    def list(self, request):
+        user = User.objects.select_related('student_profile__group').get(pk=request.user.pk)
+        groups = ContainerToGroup.objects.filter(group=user.student_profile.group_id)
+        containers = list(self.get_queryset().filter(status=OPENED, id__in=groups.values('container_id')))
+        cards = defaultdict(list)
+        for card in ContainerToCourse.objects.filter(container__in=containers).with_card_details(
+                container=False).order_by('id'):
+            cards[card.container_id].append(card)
+        for container in containers:
+            container.enrollment_cards = cards[container.id]
+        serializer = self.get_serializer(dict(user=user, containers=containers,
+                                              requests=user.student_course_requests.order_by('id')))
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from functools import partial
+
+from django.db.utils import OperationalError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+POOL_DEFAULTS = {
+    # connections of the process, requests over it wait for a returned one
+    'SIZE': 10,
+    # seconds to wait for a connection before OperationalError
+    'TIMEOUT': 5,
+    # connections which were idle longer than this are checked by SELECT 1 before they are given out
+    'PRE_PING': 30,
+}
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, timeout, pre_ping):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.idle = deque()
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.stats = dict(created=0, reused=0, discarded=0, waits=0, timeouts=0, max_in_use=0)
+
+    def count(self, stat):
+        with self.condition:
+            self.stats[stat] += 1
+
+    def get(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            if not self.idle and self.in_use >= self.size:
+                self.stats['waits'] += 1
+            while not self.idle and self.in_use >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise OperationalError('Нет свободного соединения с базой за {} с, все {} заняты'.format(
+                        self.timeout, self.size))
+                self.condition.wait(remaining)
+            self.in_use += 1
+            self.stats['max_in_use'] = max(self.stats['max_in_use'], self.in_use)
+            connection, returned_at = self.idle.pop() if self.idle else (None, None)
+        try:
+            if connection is not None and self.is_usable(connection, returned_at):
+                self.count('reused')
+                return connection
+            connection = self.connect()
+            self.count('created')
+            return connection
+        except Exception:
+            self.release()
+            raise
+
+    def is_usable(self, connection, returned_at):
+        # pre-ping of connections which could be closed by server or network while they were idle
+        if time.monotonic() - returned_at < self.pre_ping:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT 1')
+            cursor.close()
+            return True
+        except Exception:
+            self.discard(connection)
+            return False
+
+    def put(self, connection):
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.in_use -= 1
+            self.condition.notify()
+
+    def release(self):
+        with self.condition:
+            self.in_use -= 1
+            self.condition.notify()
+
+    def discard(self, connection):
+        self.count('discarded')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def get_stats(self):
+        with self.condition:
+            return dict(self.stats, size=self.size, in_use=self.in_use, idle=len(self.idle))
+
+    def close(self):
+        with self.condition:
+            while self.idle:
+                self.discard(self.idle.pop()[0])
+
+
+def get_pool(alias, settings_dict, connect):
+    # test runner changes NAME of databases, connections to the old one stay in their own pool
+    key = (alias, settings_dict['NAME'])
+    with _pools_lock:
+        if key not in _pools:
+            options = dict(POOL_DEFAULTS, **settings_dict.get('POOL', {}))
+            _pools[key] = ConnectionPool(connect, options['SIZE'], options['TIMEOUT'], options['PRE_PING'])
+        return _pools[key]
+
+
+def get_pool_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.get_stats() for (alias, name), pool in pools.items()}
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    # connections are taken from the pool of alias and returned to it instead of closing,
+    # so with CONN_MAX_AGE = 0 every request gets a ready connection when it needs one
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict, partial(super().get_new_connection, conn_params))
+        return self.pool.get()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # connection in the middle of transaction or broken by errors isn't given to anybody else
+        reusable = not self.in_atomic_block and (not self.errors_occurred or self.is_usable())
+        if reusable and not self.autocommit:
+            try:
+                self.connection.rollback()
+            except Exception:
+                reusable = False
+        if reusable:
+            self.pool.put(self.connection)
+        else:
+            self.pool.discard(self.connection)
+            self.pool.release()
@@ -0,0 +1,47 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+_state = threading.local()
+
+
+@contextmanager
+def use_replicas(allowed=True):
+    # reads go to replicas only inside of this block (safe requests of ReplicaMiddleware),
+    # commands, workers and everything else read from primary.
+    # One replica is chosen for the whole block, so queries of a request see the same state
+    previous = getattr(_state, 'replica', None)
+    _state.replica = random.choice(settings.DATABASE_REPLICAS) if allowed and settings.DATABASE_REPLICAS else None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def get_read_database():
+    return getattr(_state, 'replica', None) or PRIMARY
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return get_read_database()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas have the same rows as primary
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get the schema from primary
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
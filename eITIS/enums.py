@@ -20,6 +20,14 @@ MAGISTER = 1
 INSTITUTE_CURATOR = 0
 OUTER_CURATOR = 1
 
+DIRECT_ALLOCATION = 0
+RANKED_ALLOCATION = 1
+
+TICKET_PENDING = 0
+TICKET_PROCESSING = 1
+TICKET_DONE = 2
+TICKET_FAILED = 3
+
 
 GROUP_TYPE = (
     (BAKALAVR, 'Бакалавриат'),
@@ -43,6 +51,18 @@ ACTIVITY_TO_CONTAINER_STATUS = (
     (CLOSED, 'Прием закрыт'),
 )
 
+ALLOCATION_MODE = (
+    (DIRECT_ALLOCATION, 'Заявки рассматриваются по одной'),
+    (RANKED_ALLOCATION, 'Распределение по приоритетам студентов'),
+)
+
+TICKET_STATUS = (
+    (TICKET_PENDING, 'В очереди'),
+    (TICKET_PROCESSING, 'Обрабатывается'),
+    (TICKET_DONE, 'Заявка создана'),
+    (TICKET_FAILED, 'Заявка отклонена при проверке'),
+)
+
 REQUEST_STATUS = (
     (SUBMITTED, 'Подана'),
     (ACCEPTED, 'Принята'),
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from eITIS.db_router import use_replicas
+
+# set after a write, while it lives the client reads from primary, so it sees its own writes
+# (a new request, a changed card) which may be not on replicas yet
+PRIMARY_COOKIE = 'use_primary'
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        with use_replicas(safe and PRIMARY_COOKIE not in request.COOKIES):
+            response = self.get_response(request)
+        if not safe and settings.DATABASE_REPLICAS:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=settings.REPLICA_READ_YOUR_WRITES_SECONDS,
+                                httponly=True)
+        return response
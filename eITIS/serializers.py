@@ -0,0 +1,114 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+class FieldSelection:
+    # fields and relations asked by ?fields=id,active_course.status and ?expand=active_course.heads,
+    # both are trees of names, None stands for everything
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_request(cls, request):
+        if request is None or request.method not in SAFE_METHODS:
+            return cls()
+        params = request.query_params
+        fields = cls.parse(params[FIELDS_PARAM]) if FIELDS_PARAM in params else None
+        expand = cls.parse(params[EXPAND_PARAM]) if EXPAND_PARAM in params else None
+        if fields is not None and expand is not None:
+            # fields of a relation are shown only inside of the expanded relation
+            cls.merge(expand, fields)
+        return cls(fields, expand)
+
+    @staticmethod
+    def parse(value):
+        tree = {}
+        for path in value.split(','):
+            node = tree
+            for name in filter(None, (name.strip() for name in path.split('.'))):
+                node = node.setdefault(name, {})
+        return tree
+
+    @classmethod
+    def merge(cls, expand, fields):
+        for name, subfields in fields.items():
+            if subfields:
+                cls.merge(expand.setdefault(name, {}), subfields)
+
+    def child(self, name):
+        # relation asked without its fields is shown with all of them, but its own relations aren't expanded
+        return FieldSelection(None if self.fields is None else self.fields.get(name) or None,
+                              None if self.expand is None else self.expand.get(name, {}))
+
+    def _resolve(self, path):
+        selection = self
+        names = path.split('.')
+        for name in names[:-1]:
+            if not selection._expands(name):
+                return None, names[-1]
+            selection = selection.child(name)
+        return selection, names[-1]
+
+    def _includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def _expands(self, name):
+        return self._includes(name) and (self.expand is None or name in self.expand)
+
+    def includes(self, path):
+        selection, name = self._resolve(path)
+        return selection is not None and selection._includes(name)
+
+    def expands(self, path):
+        selection, name = self._resolve(path)
+        return selection is not None and selection._expands(name)
+
+    def join_path(self, path):
+        # lookup for select_related of expanded relations on the path, relations shown by ids aren't joined
+        names = path.split('.')
+        joined = []
+        for index in range(len(names)):
+            if not self.expands('.'.join(names[:index + 1])):
+                break
+            joined.append(names[index])
+        return '__'.join(joined) or None
+
+
+class DynamicFieldsMixin:
+    # serializer shows only fields of field_selection, relations which are not expanded are shown by ids.
+    # Root serializer takes the selection from query params of GET requests and passes it down to nested ones
+    field_selection = None
+
+    def get_field_selection(self):
+        if self.field_selection is not None:
+            return self.field_selection
+        root = self.parent
+        if isinstance(root, serializers.ListSerializer):
+            root = root.parent
+        if root is None:
+            return FieldSelection.from_request(self.context.get('request'))
+        return FieldSelection()
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.get_field_selection()
+        for name, field in list(fields.items()):
+            if not selection.includes(name):
+                del fields[name]
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if selection.expands(name):
+                nested.field_selection = selection.child(name)
+                continue
+            kwargs = dict(many=many, read_only=True)
+            if field.source not in (None, name):
+                kwargs['source'] = field.source
+            fields[name] = serializers.PrimaryKeyRelatedField(**kwargs)
+        return fields
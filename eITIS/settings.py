@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'eITIS.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -97,9 +98,28 @@ DATABASES = {
         'PASSWORD': 'qwerty123',
         'HOST': '',
         'PORT': '5432',
+        # persistent connections: a worker keeps its connection between requests for this number of seconds
+        # instead of connecting and authenticating on every request
+        'CONN_MAX_AGE': 60,
     }
 }
 
+# For threaded workers the bounded pool of eITIS/db_pool.py shares connections between threads of a process,
+# it checks connections which were idle for PRE_PING seconds by SELECT 1 before giving them out:
+#     'ENGINE': 'eITIS.db_backends.postgresql',
+#     'CONN_MAX_AGE': 0,  # connections return to the pool at the end of every request
+#     'POOL': {'SIZE': 20, 'TIMEOUT': 5, 'PRE_PING': 30},
+# SIZE times number of processes must stay below max_connections of PostgreSQL, waits and timeouts of
+# eITIS.db_pool.get_pool_stats() show that the pool is too small. `manage.py benchmark_db_connections`
+# compares latency of requests with new, persistent and pooled connections.
+
+# Aliases of DATABASES which are read-only replicas of default. Safe requests read from one random replica,
+# writes, requests of clients who wrote during the last REPLICA_READ_YOUR_WRITES_SECONDS, commands and
+# responses stored in the course cache use default (see eITIS/db_router.py and eITIS/middleware.py)
+DATABASE_REPLICAS = []
+REPLICA_READ_YOUR_WRITES_SECONDS = 10
+DATABASE_ROUTERS = ['eITIS.db_router.ReplicaRouter']
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.BasicAuthentication',
@@ -111,6 +131,30 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',)
 }
 
+# When True, POST /course_api/requests/ only puts the request into a queue and answers 202 with a ticket,
+# requests are created by `manage.py process_request_queue` worker (for the rush at enrollment opening)
+COURSE_REQUESTS_INTAKE_QUEUE = False
+
+# When True, lists of cards and requests are built straight from .values() rows (see course_module/values.py)
+# instead of serializers, responses stay the same
+COURSE_VALUES_LISTS = False
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Cache of course cards and containers responses and their ETags (see course_module/cache.py), alias of CACHES
+# shared by all workers, statistics by `manage.py course_cache_stats`. Versions bumped by one worker must reach
+# the others, so per-process LocMemCache doesn't fit (`manage.py check --deploy` fails on it) and None
+# disables the cache:
+#     CACHES['course'] = {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+#                         'LOCATION': '127.0.0.1:11211'}
+#     COURSE_CACHE_ALIAS = 'course'
+COURSE_CACHE_ALIAS = None
+COURSE_CACHE_TIMEOUT = 5 * 60
+
 FIXTURE_DIRS = (
     os.path.join(BASE_DIR, 'database_module/fixtures/'),
 )
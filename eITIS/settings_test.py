@@ -15,8 +15,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # file database instead of in-memory one, so concurrent tests can use separate connections
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
+    },
+    # replica is the same test database, tests turn routing to it on by DATABASE_REPLICAS
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
 }
+# tests run in one process
+COURSE_CACHE_ALIAS = 'default'
 
 MEDIA_ROOT = tempfile.mkdtemp()
 MEDIA_URL = 'http://testserver/media/'
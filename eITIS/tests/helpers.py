@@ -0,0 +1,24 @@
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_mommy import mommy
+from rest_framework import status
+
+from user_module.models import User
+
+
+def make_user(group_name, **kwargs):
+    user = mommy.make(User, **kwargs)
+    user.groups.add(Group.objects.get(name=group_name))
+    return user
+
+
+class QueryBudgetMixin:
+    def assertQueryBudget(self, budget, user, method, url, data=None, status_code=status.HTTP_200_OK):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data=data, format='json')
+        self.assertEqual(status_code, response.status_code)
+        self.assertLessEqual(len(queries), budget,
+                             '{} {} made {} queries'.format(method.upper(), url, len(queries)))
+        return response
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase
+
+from eITIS.db_backends.sqlite3.base import DatabaseWrapper
+from eITIS.db_pool import ConnectionPool, get_pool_stats, close_pools
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = False
+
+    def cursor(self):
+        if self.broken:
+            raise OperationalError('server closed the connection unexpectedly')
+        return self
+
+    def execute(self, sql):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def make_pool(self, size=2, timeout=0.05, pre_ping=30):
+        return ConnectionPool(FakeConnection, size, timeout, pre_ping)
+
+    def test_connections_are_reused(self):
+        pool = self.make_pool()
+        connection = pool.get()
+        pool.put(connection)
+        self.assertIs(connection, pool.get())
+        self.assertEqual((1, 1, 1), tuple(pool.get_stats()[stat] for stat in ('created', 'reused', 'in_use')))
+
+    def test_pool_is_bounded(self):
+        pool = self.make_pool()
+        connections_in_use = [pool.get(), pool.get()]
+        with self.assertRaises(OperationalError):
+            pool.get()
+        # waiting request gets the connection returned by another thread
+        threading.Timer(0.01, pool.put, [connections_in_use[0]]).start()
+        pool.timeout = 5
+        self.assertIs(connections_in_use[0], pool.get())
+        stats = pool.get_stats()
+        self.assertEqual((2, 2, 1, 2), (stats['waits'], stats['max_in_use'], stats['timeouts'], stats['created']))
+
+    def test_pre_ping_replaces_broken_connections(self):
+        pool = self.make_pool(pre_ping=0)
+        connection = pool.get()
+        pool.put(connection)
+        connection.broken = True
+        new_connection = pool.get()
+        self.assertIsNot(connection, new_connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual((2, 1, 1), tuple(pool.get_stats()[stat] for stat in ('created', 'discarded', 'in_use')))
+
+
+class PooledDatabaseWrapperTestCase(SimpleTestCase):
+    def setUp(self):
+        descriptor, self.name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(descriptor)
+        self.settings_dict = dict(connections['default'].settings_dict, NAME=self.name,
+                                  POOL=dict(SIZE=1, TIMEOUT=0.05))
+
+    def tearDown(self):
+        close_pools()
+        os.remove(self.name)
+
+    def make_wrapper(self):
+        return DatabaseWrapper(self.settings_dict, alias='pooled')
+
+    def test_closed_connection_returns_to_pool(self):
+        wrapper = self.make_wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE pooled (id integer)')
+        raw_connection = wrapper.connection
+        # pool of one connection is exhausted until it is closed
+        with self.assertRaises(OperationalError):
+            self.make_wrapper().ensure_connection()
+        wrapper.close()
+
+        other_wrapper = self.make_wrapper()
+        other_wrapper.ensure_connection()
+        self.assertIs(raw_connection, other_wrapper.connection)
+        other_wrapper.close()
+        self.assertEqual(dict(created=1, reused=1, in_use=0, idle=1),
+                         {stat: get_pool_stats()['pooled'][stat] for stat in ('created', 'reused', 'in_use', 'idle')})
+
+    def test_transaction_is_rolled_back_before_reuse(self):
+        wrapper = self.make_wrapper()
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE pooled (id integer)')
+        wrapper.set_autocommit(False)
+        with wrapper.cursor() as cursor:
+            cursor.execute('INSERT INTO pooled VALUES (1)')
+        wrapper.close()
+
+        other_wrapper = self.make_wrapper()
+        with other_wrapper.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM pooled')
+            self.assertEqual((0,), cursor.fetchone())
+        other_wrapper.close()
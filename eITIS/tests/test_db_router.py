@@ -0,0 +1,97 @@
+from django.contrib.auth.models import Group
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from model_mommy import mommy
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+
+from course_module.cache import get_cache
+from course_module.models import ContainerToCourse, CourseRequest
+from eITIS.db_router import ReplicaRouter, use_replicas, PRIMARY
+from eITIS.middleware import PRIMARY_COOKIE
+from user_module.models import User
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTestCase(SimpleTestCase):
+    router = ReplicaRouter()
+
+    def test_reads_go_to_replicas_only_when_allowed(self):
+        self.assertEqual(PRIMARY, self.router.db_for_read(User))
+        with use_replicas():
+            self.assertEqual('replica', self.router.db_for_read(User))
+            with use_replicas(False):
+                self.assertEqual(PRIMARY, self.router.db_for_read(User))
+            self.assertEqual(PRIMARY, self.router.db_for_write(User))
+        self.assertEqual(PRIMARY, self.router.db_for_read(User))
+
+    def test_one_replica_per_block(self):
+        with override_settings(DATABASE_REPLICAS=['replica', 'replica2']), use_replicas():
+            self.assertEqual(1, len({self.router.db_for_read(User) for i in range(20)}))
+
+    def test_without_replicas(self):
+        with override_settings(DATABASE_REPLICAS=[]), use_replicas():
+            self.assertEqual(PRIMARY, self.router.db_for_read(User))
+
+    def test_migrations_only_on_primary(self):
+        self.assertIsNone(self.router.allow_migrate(PRIMARY, 'course_module'))
+        self.assertFalse(self.router.allow_migrate('replica', 'course_module'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaMiddlewareTestCase(APITransactionTestCase):
+    # replica of test settings is a mirror of default, so queries are told apart by connections
+    databases = {'default', 'replica'}
+    serialized_rollback = True
+
+    def setUp(self):
+        get_cache().clear()
+        self.student = mommy.make(User)
+        self.student.groups.add(Group.objects.get(name='Students'))
+        self.relation = mommy.make(ContainerToCourse, instant_accept=True)
+        # without cached profile, so current user is read too
+        self.client.force_authenticate(User.objects.get(pk=self.student.pk))
+
+    def request(self, method, url, **data):
+        with CaptureQueriesContext(connections[PRIMARY]) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url, data=data)
+        return response, len(primary), len(replica)
+
+    def test_safe_requests_read_from_replica(self):
+        for url in ('/course_api/requests/', '/user_api/users/current_user/'):
+            response, primary, replica = self.request('get', url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(0, primary, url)
+            self.assertTrue(replica, url)
+            # ETag of versions bumped before replica got the rows would keep the stale response
+            self.assertFalse(response.has_header('ETag'))
+
+    def test_cached_responses_are_built_on_primary(self):
+        for url in ('/course_api/cards/', '/course_api/containers/'):
+            response, primary, replica = self.request('get', url)
+            self.assertEqual('MISS', response['X-Cache'])
+            self.assertTrue(primary, url)
+            self.assertTrue(response.has_header('ETag'))
+            response, primary, replica = self.request('get', url)
+            self.assertEqual('HIT', response['X-Cache'])
+            self.assertEqual(0, primary, url)
+
+    def test_client_reads_own_writes_from_primary(self):
+        response, primary, replica = self.request('post', '/course_api/requests/',
+                                                  active_course_id=self.relation.id)
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(0, replica)
+        self.assertIn(PRIMARY_COOKIE, response.cookies)
+
+        response, primary, replica = self.request('get', '/course_api/requests/')
+        self.assertEqual(CourseRequest.objects.get().id, response.data['results'][0]['id'])
+        self.assertEqual(0, replica)
+        self.assertTrue(primary)
+
+        # after the window the client reads from replica again
+        self.client.cookies.pop(PRIMARY_COOKIE)
+        response, primary, replica = self.request('get', '/course_api/requests/')
+        self.assertEqual(1, len(response.data['results']))
+        self.assertEqual(0, primary)
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('study_group_module', '0002_studygroup_study_form'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studygroup',
+            name='start_year',
+            field=models.DateField(db_index=True),
+        ),
+    ]
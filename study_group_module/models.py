@@ -1,4 +1,8 @@
+from datetime import date
+
 from django.db import models
+from django.utils import timezone
+
 from eITIS.enums import GROUP_TYPE
 
 
@@ -24,12 +28,26 @@ class Faculty(models.Model):
         return "{}, {}".format(self.institute.name, self.name)
 
 
+def get_academic_year(today=None):
+    # academic year starts on September 1 and is named by its first calendar year
+    today = today or timezone.localdate()
+    return today.year if today.month > 8 else today.year - 1
+
+
+class StudyGroupQuerySet(models.QuerySet):
+    def of_study_year(self, study_year, today=None):
+        # groups which study on the given year (1 for first-year students), they started on September 1
+        return self.filter(start_year=date(get_academic_year(today) - int(study_year) + 1, 9, 1))
+
+
 class StudyGroup(models.Model):
     group_number = models.CharField(max_length=15, unique=True)
-    start_year = models.DateField()
+    start_year = models.DateField(db_index=True)
     study_form = models.SmallIntegerField(choices=GROUP_TYPE)
     faculty = models.ForeignKey(Faculty, on_delete=models.CASCADE, related_name='groups')
 
+    objects = StudyGroupQuerySet.as_manager()
+
     def __str__(self):
         return "{}".format(self.group_number)
 
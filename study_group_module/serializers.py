@@ -1,10 +1,11 @@
 # main Group serializer
 from rest_framework import serializers
 
+from eITIS.serializers import DynamicFieldsMixin
 from .models import StudyGroup
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StudyGroup
         fields = '__all__'
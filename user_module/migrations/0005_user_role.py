@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def fill_roles(apps, schema_editor):
+    User = apps.get_model('user_module', 'User')
+    # the last update wins, so groups go from the lowest precedence to the highest
+    for group_name, role in (('Deanery_Workers', 'deanery'), ('Professors', 'professor'), ('Students', 'student')):
+        User.objects.filter(groups__name=group_name).update(role=role)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_module', '0004_studentprofile_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='role',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(fill_roles, migrations.RunPython.noop),
+    ]
@@ -21,9 +21,26 @@ def get_only_deanery_workers_q():
     return Q(groups__name='Deanery_Workers')
 
 
+# groups in order of precedence, the first group of user gives the role
+ROLE_GROUPS = (
+    ('Students', 'student'),
+    ('Professors', 'professor'),
+    ('Deanery_Workers', 'deanery'),
+)
+
+
+def get_role(group_names):
+    for group_name, role in ROLE_GROUPS:
+        if group_name in group_names:
+            return role
+    return None
+
+
 class User(AbstractUser):
     middle_name = models.CharField(max_length=20, blank=True)
     photo = models.ImageField(upload_to='avatars', blank=True)
+    # follows groups of user (see update_roles), so checks of role don't query groups
+    role = models.CharField(max_length=20, null=True, blank=True, editable=False)
 
     def __str__(self):
         return "{} {} {}".format(self.first_name, self.last_name, self.middle_name)
@@ -35,15 +52,41 @@ class User(AbstractUser):
     def full_name(self):
         return str(self)
 
-    @property
-    def role(self):
-        if self.groups.filter(name='Students').exists():
-            return 'student'
-        elif self.groups.filter(name='Professors').exists():
-            return 'professor'
-        elif self.groups.filter(name='Deanery_Workers').exists():
-            return 'deanery'
-        return None
+
+def update_roles(user_ids):
+    group_names = {user_id: set() for user_id in user_ids}
+    for user_id, group_name in User.groups.through.objects.filter(user_id__in=user_ids).values_list(
+            'user_id', 'group__name'):
+        group_names[user_id].add(group_name)
+    users_by_role = {}
+    for user_id, names in group_names.items():
+        users_by_role.setdefault(get_role(names), []).append(user_id)
+    for role, role_user_ids in users_by_role.items():
+        User.objects.filter(pk__in=role_user_ids).exclude(role=role).update(role=role)
+    return {user_id: get_role(names) for user_id, names in group_names.items()}
+
+
+def get_added_users(instance, reverse, pk_set, group_name):
+    # users who got the group, groups are added either to user or to group (group.user_set)
+    if reverse:
+        return list(User.objects.filter(pk__in=pk_set)) if instance.name == group_name else []
+    return [instance] if instance.groups.filter(name=group_name).exists() else []
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def update_role(sender, instance, action, reverse, pk_set, **kwargs):
+    # groups are changed either from user (user.groups) or from group (group.user_set)
+    if reverse and action == 'pre_clear':
+        instance._cleared_user_ids = list(instance.user_set.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.role = update_roles([instance.pk])[instance.pk]
+    elif action == 'post_clear':
+        update_roles(instance._cleared_user_ids)
+    else:
+        update_roles(pk_set)
 
 
 class StudentProfile(models.Model):
@@ -69,11 +112,10 @@ class StudentProfile(models.Model):
             raise ValidationError(message='Студент уже состоит в группе')
 
     @receiver(m2m_changed, sender=User.groups.through)
-    def create_or_update_student_profile(sender, instance, action, **kwargs):
+    def create_or_update_student_profile(sender, instance, action, reverse, pk_set, **kwargs):
         if action == 'post_add':
-            is_student = instance.groups.filter(name='Students').exists()
-            if is_student:
-                StudentProfile.objects.create(user=instance)
+            for user in get_added_users(instance, reverse, pk_set, 'Students'):
+                StudentProfile.objects.create(user=user)
 
     @receiver(pre_delete, sender=User)
     def delete_student_profile(sender, instance, **kwargs):
@@ -101,11 +143,10 @@ class ProfessorProfile(models.Model):
         verbose_name_plural = "Профили профессоров"
 
     @receiver(m2m_changed, sender=User.groups.through)
-    def create_or_update_professor_profile(sender, instance, action, **kwargs):
+    def create_or_update_professor_profile(sender, instance, action, reverse, pk_set, **kwargs):
         if action == 'post_add':
-            is_professor = instance.groups.filter(name='Professors').exists()
-            if is_professor:
-                ProfessorProfile.objects.create(user=instance)
+            for user in get_added_users(instance, reverse, pk_set, 'Professors'):
+                ProfessorProfile.objects.create(user=user)
 
     @receiver(pre_delete, sender=User)
     def delete_professor_profile(sender, instance, **kwargs):
@@ -130,11 +171,10 @@ class DeaneryProfile(models.Model):
         verbose_name_plural = "Профили сотрудников деканата"
 
     @receiver(m2m_changed, sender=User.groups.through)
-    def create_or_update_deanery_profile(sender, instance, action, **kwargs):
+    def create_or_update_deanery_profile(sender, instance, action, reverse, pk_set, **kwargs):
         if action == 'post_add':
-            is_deanery = instance.groups.filter(name='Deanery_Workers').exists()
-            if is_deanery:
-                DeaneryProfile.objects.create(user=instance)
+            for user in get_added_users(instance, reverse, pk_set, 'Deanery_Workers'):
+                DeaneryProfile.objects.create(user=user)
 
     @receiver(pre_delete, sender=User)
     def delete_deanery_profile(sender, instance, **kwargs):
@@ -12,10 +12,28 @@ class OnlyStudentCanCreate(IsAuthenticated):
         return True
 
 
+class StudentPermission(IsAuthenticated):
+    def has_permission(self, request, view):
+        res = super().has_permission(request, view)
+        if not res:
+            return res
+        else:
+            return request.user.role == 'student'
+
+
 class ProfessorPermission(IsAuthenticated):
     def has_permission(self, request, view):
         res = super().has_permission(request, view)
         if not res:
             return res
         else:
-            return request.user.role is 'professor'
+            return request.user.role == 'professor'
+
+
+class DeaneryPermission(IsAuthenticated):
+    def has_permission(self, request, view):
+        res = super().has_permission(request, view)
+        if not res:
+            return res
+        else:
+            return request.user.role == 'deanery'
@@ -2,11 +2,12 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from eITIS.serializers import DynamicFieldsMixin
 from study_group_module.serializers import GroupSerializer
 from user_module.models import User, StudentProfile, ProfessorProfile, DeaneryProfile
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'first_name', 'last_name', 'middle_name', 'username', 'email', 'photo', 'role')
@@ -14,7 +15,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 # Student Profile serializer
 # (using main Group serializer)
-class StudentProfileSerializer(serializers.ModelSerializer):
+class StudentProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StudentProfile
         fields = '__all__'
@@ -23,14 +24,14 @@ class StudentProfileSerializer(serializers.ModelSerializer):
 
 
 # Professor Profile serializer
-class ProfessorProfileSerializer(serializers.ModelSerializer):
+class ProfessorProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ProfessorProfile
         fields = ['position', 'academic_title', 'office', 'institute']
         depth = 1
 
 
-class DeaneryProfileSerializer(serializers.ModelSerializer):
+class DeaneryProfileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DeaneryProfile
         fields = ['institute']
@@ -92,7 +93,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         return user
 
 
-class UserShortSerializer(serializers.ModelSerializer):
+class UserShortSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'full_name', 'username', 'photo')
@@ -0,0 +1,27 @@
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from eITIS.tests.helpers import make_user, QueryBudgetMixin
+
+
+class UserQueryBudgetAPITestCase(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = make_user('Students')
+        cls.professor = make_user('Professors')
+        cls.deanery = make_user('Deanery_Workers')
+
+    def test_user_detail(self):
+        for budget, user in ((3, self.student), (4, self.professor), (2, self.deanery)):
+            url = reverse('user-detail', kwargs=dict(pk=user.id))
+            self.assertQueryBudget(budget, self.student, 'get', url)
+
+    def test_current_user(self):
+        for budget, user in ((1, self.student), (1, self.professor), (0, self.deanery)):
+            self.assertQueryBudget(budget, user, 'get', reverse('user-current-user'))
+
+    def test_change_password(self):
+        self.student.set_password('old_password')
+        self.student.save()
+        self.assertQueryBudget(1, self.student, 'post', reverse('user-change-password'),
+                               dict(old_password='old_password', new_password='Tr0ub4dor&3-horse'))
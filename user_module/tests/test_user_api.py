@@ -1,4 +1,5 @@
 from django.contrib.auth.models import Group
+from django.test import TestCase
 from django.urls import reverse
 from model_mommy import mommy
 from rest_framework import status
@@ -103,3 +104,51 @@ class UserAPITestCase(APITestCase):
         url = reverse('user-current-user')
         response = self.client.get(url)
         self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_student_detail_fields(self):
+        student = mommy.make(User)
+        student.groups.add(Group.objects.get(name='Students'))
+        self.client.force_login(self.user1)
+        url = reverse('user-detail', kwargs={'pk': student.id})
+        response = self.client.get(url, data=dict(fields='id,student_profile.score'))
+        self.assertEqual({'id': student.id, 'student_profile': {'score': student.student_profile.score}},
+                         response.data)
+        response = self.client.get(url, data=dict(fields='id,student_profile', expand=''))
+        self.assertEqual({'id': student.id, 'student_profile': student.student_profile.id}, response.data)
+
+
+class UserRoleTestCase(TestCase):
+    def setUp(self):
+        self.user = mommy.make(User)
+        self.students = Group.objects.get(name='Students')
+        self.professors = Group.objects.get(name='Professors')
+
+    def test_role_follows_groups_of_user(self):
+        self.assertIsNone(self.user.role)
+        self.user.groups.add(self.professors)
+        self.assertEqual('professor', self.user.role)
+        self.assertEqual('professor', User.objects.get(pk=self.user.id).role)
+        self.user.groups.remove(self.professors)
+        self.assertIsNone(User.objects.get(pk=self.user.id).role)
+
+    def test_student_group_takes_precedence(self):
+        self.user.groups.add(self.professors, self.students)
+        self.assertEqual('student', User.objects.get(pk=self.user.id).role)
+        self.user.groups.clear()
+        self.assertIsNone(User.objects.get(pk=self.user.id).role)
+
+    def test_role_follows_users_of_group(self):
+        other_user = mommy.make(User)
+        self.professors.user_set.add(self.user, other_user)
+        self.assertEqual(['professor', 'professor'], [User.objects.get(pk=user.id).role
+                                                      for user in (self.user, other_user)])
+        self.professors.user_set.remove(other_user)
+        self.assertIsNone(User.objects.get(pk=other_user.id).role)
+        self.professors.user_set.clear()
+        self.assertIsNone(User.objects.get(pk=self.user.id).role)
+
+    def test_role_check_makes_no_queries(self):
+        self.user.groups.add(self.students)
+        user = User.objects.get(pk=self.user.id)
+        with self.assertNumQueries(0):
+            self.assertEqual('student', user.role)
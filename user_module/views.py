@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from eITIS.serializers import FieldSelection
 from user_module.models import User
 from user_module.serializers import UserSerializer, StudentSerializer, ProfessorSerializer, \
     ChangePasswordSerializer
@@ -18,13 +19,24 @@ class UserViewSet(RetrieveModelMixin,
 
     def _get_serializer_class(self, user_obj):
         role = user_obj.role
-        if role is 'student':
+        if role == 'student':
             return StudentSerializer
-        elif role is 'professor':
+        elif role == 'professor':
             return ProfessorSerializer
         else:
             return UserSerializer
 
+    def get_queryset(self):
+        # profiles are shown by their ids too, and those aren't stored in the row of user
+        selection = FieldSelection.from_request(self.request)
+        related = {path for path in ('student_profile', 'professor_profile') if selection.includes(path)}
+        if selection.join_path('student_profile.group'):
+            related.add(selection.join_path('student_profile.group'))
+        queryset = super().get_queryset()
+        if selection.includes('professor_profile.institute'):
+            queryset = queryset.prefetch_related('professor_profile__institute')
+        return queryset.select_related(*related) if related else queryset
+
     def get_serializer_class(self):
         return self._get_serializer_class(self.get_object())
         
@@ -34,7 +46,7 @@ class UserViewSet(RetrieveModelMixin,
             return Response({}, status=status.HTTP_200_OK)
         else:
             serializer_class = self._get_serializer_class(request.user)
-            serializer = serializer_class(request.user)
+            serializer = serializer_class(request.user, context=self.get_serializer_context())
             return Response(serializer.data)
 
     @action(detail=False, methods=['POST'])